@@ -0,0 +1,128 @@
+import argparse
+import concurrent.futures
+import json
+import os
+
+from compression import EXTENSIONS, strip_compression_extension
+from git_log import read_repository
+from parser import Parser
+from serializer import ProjectSerializer, StreamingSerializer
+from statistics import Statistics
+from windowing import QUARTAL, parse_granularity
+
+# Commits/day of a project is the sum over its authors, so the totals add it up as well.
+ADDITIVE_FIELDS = ['commit_number', 'all_new_lines', 'all_deleted_lines', 'commits_per_day', 'commits_under_25',
+                   'commits_above_500', 'merge_commits']
+# Averages are weighted by what the project statistics divide them by.
+WEIGHT_FIELDS = {'files_per_commit': 'num_authors', 'lines_per_commit': 'commit_number',
+                 'test_line_ratio': 'all_new_lines'}
+
+
+def get_names(sources):
+    names = []
+    for source in sources:
+        name = os.path.basename(os.path.normpath(source))
+        if os.path.isfile(source):
+            name = os.path.splitext(strip_compression_extension(name))[0]
+        unique_name, index = name, 1
+        while unique_name in names:
+            index += 1
+            unique_name = '%s-%d' % (name, index)
+        names.append(unique_name)
+    return names
+
+
+def analyse_repository(source, output_path, granularity=QUARTAL, columnar=False, compression=None):
+    if os.path.isdir(source):
+        data_container = read_repository(source)
+    else:
+        data_container = Parser(source).create_data_container()
+    os.makedirs(output_path, exist_ok=True)
+    result_name = 'result.json.' + compression if compression else 'result.json'
+    with StreamingSerializer.for_path(os.path.join(output_path, result_name)) as serializer:
+        if columnar:
+            from columnar import ColumnarStatistics
+            statistics = ColumnarStatistics(data_container, granularity, serializer)
+        else:
+            statistics = Statistics(data_container, granularity, serializer)
+        statistics.generate_statistics()
+    authors = [author.author for author in statistics.all_time_stats.author_records]
+    return statistics.all_time_project_stats.project_serializer.get_dict(), authors
+
+
+def summarize(results, authors):
+    """Totals of the project statistics of all sources, authors of several sources are counted once."""
+    total = dict((field, 0) for field in ProjectSerializer.fields)
+    weights = dict((field, 0) for field in WEIGHT_FIELDS)
+    for result in results.values():
+        for field in ADDITIVE_FIELDS:
+            total[field] += result[field]
+        for field, weight_field in WEIGHT_FIELDS.items():
+            total[field] += result[field] * result[weight_field]
+            weights[field] += result[weight_field]
+    for field, weight in weights.items():
+        if weight:
+            total[field] /= float(weight)
+    total['num_authors'] = len(set(author for names in authors.values() for author in names))
+    return total
+
+
+def analyse_repositories(sources, output_path, workers=None, granularity=QUARTAL, columnar=False, compression=None):
+    """Analyses every repository or log file in a bounded process pool.
+
+    Results of each source go to their own folder, summary.json holds the all time project statistics of every
+    source and their totals.
+    """
+    results, authors, errors = {}, {}, {}
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {}
+        for source, name in zip(sources, get_names(sources)):
+            future = executor.submit(analyse_repository, source, os.path.join(output_path, name), granularity,
+                                     columnar, compression)
+            futures[future] = name
+        for future in concurrent.futures.as_completed(futures):
+            try:
+                results[futures[future]], authors[futures[future]] = future.result()
+            except Exception as error:
+                errors[futures[future]] = str(error)
+
+    summary = {
+        'repositories': dict(sorted(results.items())),
+        'errors': dict(sorted(errors.items())),
+        'total': summarize(results, authors),
+    }
+    with open(os.path.join(output_path, 'summary.json'), 'w') as file:
+        json.dump(summary, file, indent=2)
+    return summary
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='Analyse many git repositories or git log files at once.')
+    arg_parser.add_argument('sources', nargs='*', help='repository folders or log files')
+    arg_parser.add_argument('--list', help='file with one repository folder or log file per line')
+    arg_parser.add_argument('--output', default='results', help='folder for the results (default results)')
+    arg_parser.add_argument('--workers', type=int, help='number of repositories analysed at the same time')
+    arg_parser.add_argument('--columnar', action='store_true', help='compute statistics with the numpy backend')
+    arg_parser.add_argument('--granularity', type=parse_granularity, default=QUARTAL,
+                            help='period length, one of day, week, month, quarter or a number of days (default 90)')
+    arg_parser.add_argument('--compression', choices=EXTENSIONS, help='compress every result.json this way')
+    args = arg_parser.parse_args()
+
+    sources = list(args.sources)
+    if args.list:
+        with open(args.list, 'r') as file:
+            sources.extend(line.strip() for line in file if line.strip())
+    if not sources:
+        arg_parser.error('no repositories given')
+
+    os.makedirs(args.output, exist_ok=True)
+    summary = analyse_repositories(sources, args.output, args.workers, args.granularity, args.columnar,
+                                   args.compression)
+    for name, result in summary['repositories'].items():
+        print("{:<30}{:<15}{:<15}".format(name, result['commit_number'], result['all_new_lines']))
+    for name, error in summary['errors'].items():
+        print("{:<30}failed: {}".format(name, error))
+
+
+if __name__ == '__main__':
+    main()
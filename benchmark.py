@@ -0,0 +1,137 @@
+import argparse
+import gc
+import json
+import os
+import random
+import shutil
+import tempfile
+import time
+import tracemalloc
+
+from parser import Parser
+from statistics import Statistics
+from visualisation import Visualisation
+
+START_TIME = 1500000000
+FILE_TYPES = ['.py', '.py', '.py', '.js', '.html', '.css', '.rb', '.md']
+
+
+def generate_log(path, commits, authors=50, files=2000, merge_commits=None, seed=0):
+    """Writes a deterministic git log in the format extraction_script.sh produces.
+
+    Emails are built so that Helpers.scramble_function keeps them distinct, some files have a type the parser
+    drops and merge commits carry no numstat lines, like in real git output.
+    """
+    generator = random.Random(seed)
+    if merge_commits is None:
+        merge_commits = commits // 20
+    emails = ['%03d.dev@example.%03d' % (index % 1000, index // 1000) for index in range(authors)]
+    paths = []
+    for index in range(files):
+        folder = 'tests' if index % 5 == 0 else 'module%d' % (index % 37)
+        prefix = 'test_' if folder == 'tests' else 'file'
+        paths.append('%s/%s%d%s' % (folder, prefix, index, generator.choice(FILE_TYPES)))
+    merges = set(generator.sample(range(commits), min(merge_commits, commits)))
+
+    commit_time = START_TIME
+    with open(path, 'w') as file:
+        for index in range(commits):
+            commit_time -= generator.randint(60, 12 * 60 * 60)
+            email = generator.choice(emails)
+            file.write('start\n%07x;%s;%d;%s;%d;;\nstartcomment\n' % (index, email, commit_time - 30, email,
+                                                                      commit_time))
+            if index in merges:
+                file.write("Merge branch 'feature-%d';\nend\n\n" % index)
+                continue
+            file.write('Change number %d;\nend\n' % index)
+            for changed_path in generator.sample(paths, min(generator.randint(1, 8), len(paths))):
+                if generator.random() < 0.01:
+                    file.write('-\t-\t%s\n' % changed_path)
+                else:
+                    file.write('%d\t%d\t%s\n' % (generator.randint(0, 400), generator.randint(0, 150), changed_path))
+            file.write('\n')
+
+
+class PhaseTimer:
+    def __init__(self, trace_memory=False):
+        self.trace_memory = trace_memory
+        self.phases = []
+
+    def measure(self, name, function, *args, **kwargs):
+        gc.collect()
+        if self.trace_memory:
+            tracemalloc.start()
+        start = time.perf_counter()
+        result = function(*args, **kwargs)
+        phase = {'phase': name, 'seconds': time.perf_counter() - start}
+        if self.trace_memory:
+            phase['peak_mb'] = tracemalloc.get_traced_memory()[1] / 1e6
+            tracemalloc.stop()
+        self.phases.append(phase)
+        return result
+
+
+def run_benchmark(log_path, columnar=False, visualise=True, trace_memory=False):
+    timer = PhaseTimer(trace_memory)
+    data_container = timer.measure('parse', lambda: Parser(log_path).create_data_container())
+    if columnar:
+        from columnar import ColumnarStatistics
+        statistics = timer.measure('columnar', ColumnarStatistics, data_container)
+    else:
+        statistics = Statistics(data_container)
+    statistics.all_time_stats = timer.measure('author statistics', statistics.generate_all_time_stats)
+    statistics.all_time_project_stats = timer.measure('project statistics', statistics.generate_all_time_project_stats)
+    timer.measure('quarterly windows', statistics.generate_quartal_statistics)
+    timer.measure('serialization', statistics.general_serializer.serialize)
+    if visualise:
+        image_folder = tempfile.mkdtemp()
+        try:
+            if trace_memory:
+                # tracemalloc only sees this process, so the charts are rendered here instead of in a pool.
+                timer.measure('visualisation, 1 process', Visualisation, statistics, image_folder, 1)
+            else:
+                timer.measure('visualisation', Visualisation, statistics, image_folder)
+        finally:
+            shutil.rmtree(image_folder)
+    return timer.phases
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='Time every phase of ProMinGit on synthetic git logs.')
+    arg_parser.add_argument('--commits', type=int, nargs='+', default=[10000, 100000, 1000000])
+    arg_parser.add_argument('--authors', type=int, default=50)
+    arg_parser.add_argument('--files', type=int, default=2000)
+    arg_parser.add_argument('--merge-commits', type=int, help='merge commits per log (default 5%% of the commits)')
+    arg_parser.add_argument('--seed', type=int, default=0)
+    arg_parser.add_argument('--columnar', action='store_true', help='compute statistics with the numpy backend')
+    arg_parser.add_argument('--no-visualisation', action='store_true', help='skip rendering the charts')
+    arg_parser.add_argument('--memory', action='store_true',
+                            help='record the peak memory of every phase, makes the phases slower')
+    arg_parser.add_argument('--report', help='write the measurements to this json file')
+    args = arg_parser.parse_args()
+
+    folder = tempfile.mkdtemp()
+    report = []
+    try:
+        for commits in args.commits:
+            log_path = os.path.join(folder, 'gitlog_%d.log' % commits)
+            generate_log(log_path, commits, args.authors, args.files, args.merge_commits, args.seed)
+            phases = run_benchmark(log_path, args.columnar, not args.no_visualisation, args.memory)
+            report.append({'commits': commits, 'log_bytes': os.path.getsize(log_path), 'phases': phases})
+            os.remove(log_path)
+
+            print('%d commits' % commits)
+            for phase in phases:
+                print("{:<26}{:>10.3f} s{:>12}".format(
+                    phase['phase'], phase['seconds'], '%.1f MB' % phase['peak_mb'] if 'peak_mb' in phase else ''))
+            print(" ")
+    finally:
+        shutil.rmtree(folder)
+
+    if args.report:
+        with open(args.report, 'w') as file:
+            json.dump(report, file, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,146 @@
+import heapq
+import operator
+
+from windowing import GRANULARITIES, window_start
+
+
+class FileChurn:
+    __slots__ = ['path', 'additions', 'deletions', 'change_count', 'authors', 'first_touch', 'last_touch', 'periods']
+
+    def __init__(self, path):
+        self.path = path
+        self.additions = 0
+        self.deletions = 0
+        self.change_count = 0
+        self.authors = set()
+        self.first_touch = None
+        self.last_touch = None
+        # Period start -> [additions, deletions, change count]
+        self.periods = {}
+
+    @property
+    def churn(self):
+        return self.additions + self.deletions
+
+    @property
+    def number_of_authors(self):
+        return len(self.authors)
+
+    def add(self, author_email, time, additions, deletions, period):
+        self.additions += additions
+        self.deletions += deletions
+        self.change_count += 1
+        self.authors.add(author_email)
+        if self.first_touch is None or time < self.first_touch:
+            self.first_touch = time
+        if self.last_touch is None or time > self.last_touch:
+            self.last_touch = time
+        counters = self.periods.get(period)
+        if counters is None:
+            counters = self.periods[period] = [0, 0, 0]
+        counters[0] += additions
+        counters[1] += deletions
+        counters[2] += 1
+
+    def merge(self, other):
+        self.additions += other.additions
+        self.deletions += other.deletions
+        self.change_count += other.change_count
+        self.authors.update(other.authors)
+        for time in (other.first_touch, other.last_touch):
+            if time is not None:
+                if self.first_touch is None or time < self.first_touch:
+                    self.first_touch = time
+                if self.last_touch is None or time > self.last_touch:
+                    self.last_touch = time
+        for period, other_counters in other.periods.items():
+            counters = self.periods.setdefault(period, [0, 0, 0])
+            for index, value in enumerate(other_counters):
+                counters[index] += value
+
+    def get_period_values(self, time_from, time_to):
+        additions = deletions = change_count = 0
+        for period, counters in self.periods.items():
+            if (time_from is None or time_from <= period) and (time_to is None or period < time_to):
+                additions += counters[0]
+                deletions += counters[1]
+                change_count += counters[2]
+        return {'churn': additions + deletions, 'additions': additions, 'deletions': deletions,
+                'change_count': change_count}
+
+    def get_dict(self):
+        return {
+            'path': self.path.strip(),
+            'churn': self.churn,
+            'additions': self.additions,
+            'deletions': self.deletions,
+            'change_count': self.change_count,
+            'number_of_authors': self.number_of_authors,
+            'first_touch': str(self.first_touch),
+            'last_touch': str(self.last_touch),
+        }
+
+
+class ChurnIndex:
+    """Per file churn, filled by the parser one file change at a time or from an analysed history.
+
+    Besides the totals, every file keeps its counters per granularity period, so window queries only sum those
+    periods. Windows are aligned to the periods, a period counts when it starts inside the window.
+    """
+    metrics = ['churn', 'additions', 'deletions', 'change_count', 'number_of_authors']
+    period_metrics = ['churn', 'additions', 'deletions', 'change_count']
+
+    def __init__(self, granularity='month'):
+        if granularity not in GRANULARITIES:
+            raise ValueError('Unknown granularity %s' % granularity)
+        self.granularity = granularity
+        self.files = {}
+        self.last_time = None
+        self.last_period = None
+
+    def __len__(self):
+        return len(self.files)
+
+    def add(self, file_change, author, commit):
+        if commit.commit_time != self.last_time:
+            self.last_time = commit.commit_time
+            self.last_period = window_start(commit.commit_time, self.granularity)
+        path = file_change.file.path
+        churn = self.files.get(path)
+        if churn is None:
+            churn = self.files[path] = FileChurn(path)
+        churn.add(author.author_email, commit.commit_time, file_change.additions, file_change.deletions,
+                  self.last_period)
+
+    def add_commits(self, author_commits):
+        for author, commit in author_commits:
+            for file_change in commit.file_changes:
+                self.add(file_change, author, commit)
+        return self
+
+    def merge(self, other, exclude=()):
+        """Adds the files of another index except the paths in exclude."""
+        for path, other_churn in other.files.items():
+            if path in exclude:
+                continue
+            churn = self.files.get(path)
+            if churn is None:
+                churn = self.files[path] = FileChurn(path)
+            churn.merge(other_churn)
+
+    def top(self, k=10, metric='churn', time_from=None, time_to=None):
+        """Returns the k files with the highest metric, as (value, FileChurn) pairs, using a bounded heap."""
+        if metric not in self.metrics:
+            raise ValueError('Unknown metric %s' % metric)
+        if time_from is None and time_to is None:
+            get_value = operator.attrgetter(metric)
+            return [(get_value(churn), churn) for churn in heapq.nlargest(k, self.files.values(), key=get_value)]
+        if metric not in self.period_metrics:
+            raise ValueError('Metric %s is not kept per period' % metric)
+        values = ((churn.get_period_values(time_from, time_to)[metric], churn) for churn in self.files.values())
+        return [item for item in heapq.nlargest(k, values, key=operator.itemgetter(0)) if item[0]]
+
+    def print_top(self, k=10, metric='churn', time_from=None, time_to=None):
+        print("{:<60}{:<15}".format('File', metric))
+        for value, churn in self.top(k, metric, time_from, time_to):
+            print("{:<60}{:<15}".format(churn.path.strip(), value))
@@ -0,0 +1,328 @@
+import datetime
+import itertools
+import multiprocessing
+import os
+
+import numpy
+
+from compression import detect_compression
+from models import AuthorRecord, File, InvalidFileType
+from parser import Parser, find_chunks, parse_chunk
+from serializer import AuthorSerializer
+from sessions import Sessions
+from statistics import AuthorPeriodStatistics, Statistics
+from windowing import QUARTAL
+
+class ColumnarDataContainer:
+    """Column oriented copy of a DataContainer.
+
+    Commits are stored in log order (newest first), one numpy array per attribute. File changes reference
+    their commit and file by index.
+    """
+    def __init__(self, authors, files, file_is_test, commit_hash, commit_email, commit_branch, commit_comment,
+                 commit_author, commit_author_time, commit_time, commit_additions, commit_deletions,
+                 commit_new_lines, commit_test_new_lines, commit_files, commit_merge,
+                 change_commit, change_file, change_additions, change_deletions, renamed_paths=None):
+        self.authors = authors
+        self.files = files
+        self.file_is_test = file_is_test
+        self.commit_hash = commit_hash
+        self.commit_email = commit_email
+        self.commit_branch = commit_branch
+        self.commit_comment = commit_comment
+        self.commit_author = commit_author
+        self.commit_author_time = commit_author_time
+        self.commit_time = commit_time
+        self.commit_additions = commit_additions
+        self.commit_deletions = commit_deletions
+        self.commit_new_lines = commit_new_lines
+        self.commit_test_new_lines = commit_test_new_lines
+        self.commit_files = commit_files
+        self.commit_merge = commit_merge
+        self.change_commit = change_commit
+        self.change_file = change_file
+        self.change_additions = change_additions
+        self.change_deletions = change_deletions
+        self.renamed_paths = renamed_paths
+
+    @property
+    def commit_changes(self):
+        return self.commit_additions + self.commit_deletions
+
+    @property
+    def number_of_authors(self):
+        return len(self.authors)
+
+    @property
+    def number_of_commits(self):
+        return len(self.commit_time)
+
+    @classmethod
+    def from_data_container(cls, data_container):
+        file_index = {}
+        for index, file in enumerate(data_container.file_list):
+            file_index[id(file)] = index
+        commit_author_index = {}
+        for index, author in enumerate(data_container.author_list):
+            for commit in author.commits:
+                commit_author_index[id(commit)] = index
+
+        commits = data_container.commit_list
+        change_commit, change_file, change_additions, change_deletions = [], [], [], []
+        for index, commit in enumerate(commits):
+            for change in commit.file_changes:
+                change_commit.append(index)
+                change_file.append(file_index[id(change.file)])
+                change_additions.append(change.additions)
+                change_deletions.append(change.deletions)
+
+        return cls(
+            authors=[author.author_email for author in data_container.author_list],
+            files=[file.path for file in data_container.file_list],
+            file_is_test=numpy.array([file.is_test for file in data_container.file_list], dtype=bool),
+            commit_hash=[commit.short_hash for commit in commits],
+            commit_email=[commit.commit_email for commit in commits],
+            commit_branch=[commit.branch for commit in commits],
+            commit_comment=[commit.comment for commit in commits],
+            commit_author=numpy.array([commit_author_index[id(commit)] for commit in commits], dtype=numpy.int32),
+            commit_author_time=numpy.array([commit.author_time.timestamp() for commit in commits], dtype=numpy.float64),
+            commit_time=numpy.array([commit.commit_time.timestamp() for commit in commits], dtype=numpy.float64),
+            commit_additions=numpy.array([commit.number_of_additions for commit in commits], dtype=numpy.int64),
+            commit_deletions=numpy.array([commit.number_of_deletions for commit in commits], dtype=numpy.int64),
+            commit_new_lines=numpy.array([commit.number_of_new_lines for commit in commits], dtype=numpy.int64),
+            commit_test_new_lines=numpy.array([commit.number_of_test_new_lines for commit in commits],
+                                              dtype=numpy.int64),
+            commit_files=numpy.array([len(commit.file_changes) for commit in commits], dtype=numpy.int32),
+            commit_merge=numpy.array([commit.is_merge_commit for commit in commits], dtype=bool),
+            change_commit=numpy.array(change_commit, dtype=numpy.int64),
+            change_file=numpy.array(change_file, dtype=numpy.int32),
+            change_additions=numpy.array(change_additions, dtype=numpy.int32),
+            change_deletions=numpy.array(change_deletions, dtype=numpy.int32),
+            renamed_paths=getattr(data_container, 'renamed_paths', None),
+        )
+
+    @classmethod
+    def concatenate(cls, data_containers):
+        """Joins containers given in log order, renames of newer containers are resolved in the older ones.
+
+        Changes move to the newest path of their file, or are dropped when it has a dropped file type, so the commit
+        totals are recounted from the changes.
+        """
+        authors, author_index, files, file_index, file_is_test = [], {}, [], {}, []
+        author_maps, file_maps, commit_offsets = [], [], []
+        renamed_paths, invalid_paths = {}, set()
+        commit_offset = 0
+        for container in data_containers:
+            for author in container.authors:
+                if author not in author_index:
+                    author_index[author] = len(authors)
+                    authors.append(author)
+            for old_path, file_path in (container.renamed_paths or {}).items():
+                file_path = renamed_paths.get(file_path, file_path)
+                if old_path != file_path:
+                    renamed_paths[old_path] = file_path
+            file_map = []
+            for path, is_test in zip(container.files, container.file_is_test):
+                file = renamed_paths.get(path, path)
+                if file not in file_index and file not in invalid_paths:
+                    try:
+                        if file != path:
+                            is_test = File(file).is_test
+                        file_index[file] = len(files)
+                        files.append(file)
+                        file_is_test.append(is_test)
+                    except InvalidFileType:
+                        invalid_paths.add(file)
+                file_map.append(file_index.get(file, -1))
+            author_maps.append(numpy.array([author_index[author] for author in container.authors], dtype=numpy.int32))
+            file_maps.append(numpy.array(file_map, dtype=numpy.int32))
+            commit_offsets.append(commit_offset)
+            commit_offset += container.number_of_commits
+
+        def join(name):
+            return numpy.concatenate([getattr(container, name) for container in data_containers])
+
+        def chain(name):
+            return list(itertools.chain.from_iterable(getattr(container, name) for container in data_containers))
+
+        change_file = numpy.concatenate([file_map[container.change_file] for file_map, container
+                                         in zip(file_maps, data_containers)]).astype(numpy.int32)
+        kept = change_file >= 0
+        change_file = change_file[kept]
+        change_commit = numpy.concatenate([container.change_commit + offset for offset, container
+                                           in zip(commit_offsets, data_containers)])[kept]
+        change_additions = join('change_additions')[kept]
+        change_deletions = join('change_deletions')[kept]
+        file_is_test = numpy.array(file_is_test, dtype=bool)
+        change_new_lines = numpy.maximum(change_additions - change_deletions, 0)
+
+        def count(weights=None):
+            return numpy.bincount(change_commit, weights, minlength=commit_offset).astype(numpy.int64)
+
+        return cls(
+            authors=authors,
+            files=files,
+            file_is_test=file_is_test,
+            commit_hash=chain('commit_hash'),
+            commit_email=chain('commit_email'),
+            commit_branch=chain('commit_branch'),
+            commit_comment=chain('commit_comment'),
+            commit_author=numpy.concatenate([author_map[container.commit_author] for author_map, container
+                                             in zip(author_maps, data_containers)]).astype(numpy.int32),
+            commit_author_time=join('commit_author_time'),
+            commit_time=join('commit_time'),
+            commit_additions=count(change_additions),
+            commit_deletions=count(change_deletions),
+            commit_new_lines=count(change_new_lines),
+            commit_test_new_lines=count(change_new_lines * file_is_test[change_file]),
+            commit_files=count().astype(numpy.int32),
+            commit_merge=join('commit_merge'),
+            change_commit=change_commit,
+            change_file=change_file,
+            change_additions=change_additions,
+            change_deletions=change_deletions,
+            renamed_paths=renamed_paths,
+        )
+
+    @classmethod
+    def from_log(cls, file_path, processes=None):
+        """Parses the log in a process pool, every worker returns its chunk in columnar form.
+
+        Compressed logs can not be split at byte offsets and are parsed in this process.
+        """
+        if detect_compression(file_path) is not None:
+            return cls.from_data_container(Parser(file_path).create_data_container())
+        processes = processes or os.cpu_count()
+        chunks = find_chunks(file_path, processes)
+        with multiprocessing.Pool(min(processes, len(chunks))) as pool:
+            partials = pool.starmap(parse_columnar_chunk, [(file_path, begin, end) for begin, end in chunks])
+        return cls.concatenate(partials)
+
+    def window_mask(self, time_from=None, time_to=None):
+        if not time_from or not time_to:
+            return numpy.ones(self.number_of_commits, dtype=bool)
+        return (self.commit_time >= time_from.timestamp()) & (self.commit_time < time_to.timestamp())
+
+
+def parse_columnar_chunk(file_path, begin, end):
+    return ColumnarDataContainer.from_data_container(parse_chunk(file_path, begin, end))
+
+
+class ColumnarAuthorPeriodStatistics(AuthorPeriodStatistics):
+    """Vectorized counterpart of AuthorPeriodStatistics, all authors are reduced at once with bincount."""
+    def __init__(self, data_container, time_from=None, time_to=None, window_commits=None):
+        self.data_container = data_container
+        self.time_from = time_from
+        self.time_to = time_to
+        self.window_commits = window_commits
+        self.obj_author_data = []
+        self.author_records = []
+        self.extract_statistics()
+
+    def extract_statistics(self):
+        container = self.data_container
+        size = container.number_of_authors
+        if self.window_commits is not None:
+            mask = self.window_commits
+        else:
+            mask = container.window_mask(self.time_from, self.time_to)
+        authors = container.commit_author[mask]
+
+        def per_author(values):
+            return numpy.bincount(authors, weights=values[mask], minlength=size)
+
+        commit_number = numpy.bincount(authors, minlength=size)
+        new_lines = per_author(container.commit_new_lines).astype(numpy.int64)
+        deleted_lines = per_author(container.commit_deletions).astype(numpy.int64)
+        test_lines = per_author(container.commit_test_new_lines).astype(numpy.int64)
+        files = per_author(container.commit_files)
+        changes = container.commit_changes[mask]
+        under_25 = numpy.bincount(authors[changes < 25], minlength=size)
+        under_500 = numpy.bincount(authors[changes < 500], minlength=size)
+        merges = numpy.bincount(authors[container.commit_merge[mask]], minlength=size)
+        self.sessions = Sessions(authors, container.commit_author_time[mask], size)
+
+        active = numpy.flatnonzero(commit_number)
+        with numpy.errstate(divide='ignore', invalid='ignore'):
+            commits_per_day = commit_number / self.sessions.sessions_per_author
+            files_per_commit = files / commit_number
+            lines_per_commit = new_lines / commit_number
+            test_line_ratio = test_lines / new_lines
+
+        self.author_records = []
+        for index in active.tolist():
+            author = AuthorRecord(
+                author=container.authors[index],
+                commit_number=int(commit_number[index]),
+                all_new_lines=int(new_lines[index]),
+                all_deleted_lines=int(deleted_lines[index]),
+                commits_per_day=float(commits_per_day[index]),
+                files_per_commit=float(files_per_commit[index]),
+                lines_per_commit=float(lines_per_commit[index]),
+                commits_under_25=int(under_25[index]),
+                commits_above_500=int(under_500[index]),
+                test_line_number=int(test_lines[index]),
+                test_line_ratio=float(test_line_ratio[index]) if test_lines[index] else 0,
+                merge_commits=int(merges[index]),
+            )
+            self.author_records.append(author)
+        self.obj_author_data = [AuthorSerializer(author) for author in self.author_records]
+
+
+class ColumnarStatistics(Statistics):
+    author_statistics_class = ColumnarAuthorPeriodStatistics
+
+    def __init__(self, data_container, granularity=QUARTAL, serializer=None, processes=None):
+        if not isinstance(data_container, ColumnarDataContainer):
+            data_container = ColumnarDataContainer.from_data_container(data_container)
+        super().__init__(data_container, granularity, serializer, processes)
+
+    def bucket_commits(self, boundaries):
+        # Commit indices of every window, sorted once by window and kept in log order inside a window.
+        windows = numpy.searchsorted([boundary.timestamp() for boundary in boundaries],
+                                     self.data_container.commit_time, side='right') - 1
+        order = numpy.argsort(windows, kind='stable')
+        splits = numpy.searchsorted(windows[order], numpy.arange(len(boundaries)))
+        return numpy.split(order, splits)[1:len(boundaries)]
+
+    def rolling_statistics(self, width, step):
+        # Prefix sums over the time sorted commits turn every window into two lookups.
+        container = self.data_container
+        order = numpy.argsort(container.commit_time, kind='stable')
+        times = container.commit_time[order]
+        if not len(times):
+            return []
+        sums = {}
+        for name, values in [('commit_number', numpy.ones(len(order), dtype=numpy.int64)),
+                             ('all_new_lines', container.commit_new_lines),
+                             ('all_deleted_lines', container.commit_deletions),
+                             ('test_line_number', container.commit_test_new_lines),
+                             ('file_changes', container.commit_files),
+                             ('merge_commits', container.commit_merge)]:
+            sums[name] = numpy.concatenate([[0], numpy.cumsum(values[order])])
+        authors = container.commit_author[order]
+
+        results = []
+        time_from = datetime.datetime.fromtimestamp(times[0])
+        while time_from.timestamp() <= times[-1]:
+            time_to = time_from + width
+            first, last = numpy.searchsorted(times, [time_from.timestamp(), time_to.timestamp()])
+            totals = dict((name, int(values[last] - values[first])) for name, values in sums.items())
+            commit_number = totals['commit_number']
+            results.append((time_from, time_to, {
+                'num_authors': len(numpy.unique(authors[first:last])),
+                'commit_number': commit_number,
+                'all_new_lines': totals['all_new_lines'],
+                'all_deleted_lines': totals['all_deleted_lines'],
+                'files_per_commit': totals['file_changes'] / commit_number if commit_number else 0,
+                'lines_per_commit': totals['all_new_lines'] / commit_number if commit_number else 0,
+                'test_line_ratio': totals['test_line_number'] / totals['all_new_lines']
+                if totals['all_new_lines'] else 0,
+                'merge_commits': totals['merge_commits'],
+            }))
+            time_from += step
+        return results
+
+    def get_project_interval(self):
+        return datetime.datetime.fromtimestamp(self.data_container.commit_time[-1]), \
+               datetime.datetime.fromtimestamp(self.data_container.commit_time[0])
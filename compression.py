@@ -0,0 +1,63 @@
+import bz2
+import gzip
+import io
+import lzma
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+MAGIC_NUMBERS = [
+    (b'\x1f\x8b', 'gz'),
+    (b'BZh', 'bz2'),
+    (b'\xfd7zXZ\x00', 'xz'),
+    (b'\x28\xb5\x2f\xfd', 'zst'),
+]
+EXTENSIONS = ['gz', 'bz2', 'xz', 'zst']
+
+
+def detect_compression(path):
+    """Returns the compression of a file from its first bytes, or None for plain files."""
+    with open(path, 'rb') as file:
+        head = file.read(6)
+    for magic, compression in MAGIC_NUMBERS:
+        if head.startswith(magic):
+            return compression
+    return None
+
+
+def get_extension_compression(path):
+    extension = path.rsplit('.', 1)[-1]
+    return extension if extension in EXTENSIONS else None
+
+
+def strip_compression_extension(path):
+    if get_extension_compression(path) is not None:
+        return path.rsplit('.', 1)[0]
+    return path
+
+
+def open_text(path, mode='r', newline=None):
+    """Opens a text file that is decompressed or compressed as a stream.
+
+    Reading detects the compression from the content, writing picks it from the gz, bz2, xz or zst extension.
+    zstd needs the zstandard package.
+    """
+    compression = detect_compression(path) if mode == 'r' else get_extension_compression(path)
+    text_mode = mode + 't'
+    if compression is None:
+        return open(path, mode, newline=newline)
+    if compression == 'gz':
+        return gzip.open(path, text_mode, newline=newline)
+    if compression == 'bz2':
+        return bz2.open(path, text_mode, newline=newline)
+    if compression == 'xz':
+        return lzma.open(path, text_mode, newline=newline)
+    if zstandard is None:
+        raise ValueError('Reading and writing %s needs the zstandard package' % path)
+    if mode == 'r':
+        stream = zstandard.ZstdDecompressor().stream_reader(open(path, 'rb'), closefd=True)
+    else:
+        stream = zstandard.ZstdCompressor().stream_writer(open(path, 'wb'), closefd=True)
+    return io.TextIOWrapper(stream, newline=newline)
@@ -0,0 +1,118 @@
+import csv
+import heapq
+import itertools
+
+MAX_FILES_PER_COMMIT = 30
+MAX_PAIRS = 1000000
+
+
+class ChangeCoupling:
+    """Sparse file x file matrix of how often two files change in the same commit.
+
+    Merge commits and commits touching more than max_files_per_commit files are skipped, they couple everything
+    with everything. Pairs are lossy counted: once more than max_pairs pairs are kept, bucket is raised until at
+    most half of them have count + delta above it, the others are dropped. A pair added later gets the bucket at
+    that time as its delta, the number of its commits that may have been dropped before. Counts never exceed the
+    true support, which is at most count + delta.
+    """
+    def __init__(self, max_files_per_commit=MAX_FILES_PER_COMMIT, skip_merge_commits=True, max_pairs=MAX_PAIRS):
+        self.max_files_per_commit = max_files_per_commit
+        self.skip_merge_commits = skip_merge_commits
+        self.max_pairs = max_pairs
+        self.paths = []
+        self.file_ids = {}
+        self.file_commits = []
+        self.pairs = {}
+        # Deltas of the pairs added after the first pruning, all other pairs have delta 0.
+        self.deltas = {}
+        self.bucket = 0
+        self.commits = 0
+        self.skipped_commits = 0
+
+    def get_file_id(self, path):
+        file_id = self.file_ids.get(path)
+        if file_id is None:
+            file_id = self.file_ids[path] = len(self.paths)
+            self.paths.append(path)
+            self.file_commits.append(0)
+        return file_id
+
+    def add_commit(self, commit):
+        if self.skip_merge_commits and commit.is_merge_commit:
+            self.skipped_commits += 1
+            return
+        paths = set(change.file.path for change in commit.file_changes)
+        if len(paths) > self.max_files_per_commit:
+            self.skipped_commits += 1
+            return
+        self.commits += 1
+        file_ids = sorted(self.get_file_id(path) for path in paths)
+        for file_id in file_ids:
+            self.file_commits[file_id] += 1
+        for pair in itertools.combinations(file_ids, 2):
+            count = self.pairs.get(pair)
+            if count is None:
+                self.pairs[pair] = 1
+                if self.bucket:
+                    self.deltas[pair] = self.bucket
+            else:
+                self.pairs[pair] = count + 1
+        if len(self.pairs) > self.max_pairs:
+            self.prune()
+
+    def add_commits(self, commits):
+        for commit in commits:
+            self.add_commit(commit)
+        return self
+
+    def prune(self):
+        deltas = self.deltas
+        while len(self.pairs) > self.max_pairs // 2:
+            self.bucket += 1
+            self.pairs = dict((pair, count) for pair, count in self.pairs.items()
+                              if count + deltas.get(pair, 0) > self.bucket)
+        self.deltas = dict((pair, delta) for pair, delta in deltas.items() if pair in self.pairs)
+
+    def get_support_bounds(self, first_path, second_path):
+        """Returns the lowest and highest possible support of two files, (0, bucket) for pairs not kept."""
+        if first_path not in self.file_ids or second_path not in self.file_ids:
+            return 0, 0
+        pair = tuple(sorted((self.file_ids[first_path], self.file_ids[second_path])))
+        count = self.pairs.get(pair)
+        if count is None:
+            return 0, self.bucket
+        return count, count + self.deltas.get(pair, 0)
+
+    def get_pairs(self, min_support=2, min_confidence=0.0):
+        """Yields (path, coupled path, support, confidence) in both directions of every pair above the limits.
+
+        After pruning, support is the lower bound of get_support_bounds. Confidence is the share of the commits changing path that also change the coupled path.
+        """
+        for (first, second), support in self.pairs.items():
+            if support < min_support:
+                continue
+            for path_id, coupled_id in ((first, second), (second, first)):
+                confidence = support / float(self.file_commits[path_id])
+                if confidence >= min_confidence:
+                    yield self.paths[path_id], self.paths[coupled_id], support, confidence
+
+    def top_coupled(self, k=5, min_support=2, min_confidence=0.0):
+        """Returns the k most coupled files of every file, ordered by support and confidence, from bounded heaps."""
+        heaps = {}
+        for path, coupled_path, support, confidence in self.get_pairs(min_support, min_confidence):
+            heap = heaps.setdefault(path, [])
+            item = (support, confidence, coupled_path)
+            if len(heap) < k:
+                heapq.heappush(heap, item)
+            elif item > heap[0]:
+                heapq.heapreplace(heap, item)
+        return dict((path, [(coupled_path, support, confidence) for support, confidence, coupled_path
+                            in sorted(heap, reverse=True)]) for path, heap in heaps.items())
+
+    def write_csv(self, path, k=5, min_support=2, min_confidence=0.0):
+        with open(path, 'w', newline='') as file:
+            writer = csv.writer(file)
+            writer.writerow(['file', 'coupled_file', 'support', 'confidence'])
+            for file_path, coupled in sorted(self.top_coupled(k, min_support, min_confidence).items()):
+                for coupled_path, support, confidence in coupled:
+                    writer.writerow([file_path.strip(), coupled_path.strip(), support, '%.4f' % confidence])
@@ -1,8 +1,15 @@
 class DataContainer:
-    def __init__(self, author_list=None, author_dict=None, commit_list=None, file_list=None, file_dict=None, file_change_list=None):
+    def __init__(self, author_list=None, author_dict=None, commit_list=None, file_list=None, file_dict=None, file_change_list=None,
+                 number_of_lines=0, dropped_file_changes=0, churn_index=None, directory_tree=None,
+                 renamed_paths=None):
         self.author_list = author_list
         self.author_dict = author_dict
         self.commit_list = commit_list
         self.file_list = file_list
         self.file_dict = file_dict
         self.file_change_list = file_change_list
+        self.number_of_lines = number_of_lines
+        self.dropped_file_changes = dropped_file_changes
+        self.churn_index = churn_index
+        self.directory_tree = directory_tree
+        self.renamed_paths = renamed_paths
@@ -0,0 +1,232 @@
+import heapq
+import json
+import pickle
+import tempfile
+
+CASES = ['author', 'file', 'branch']
+ACTIVITIES = ['directory', 'file_type', 'author']
+DEFAULT_ACTIVITIES = {'author': 'directory', 'file': 'author', 'branch': 'author'}
+MERGE_ACTIVITY = 'merge'
+UNKNOWN_BRANCH = 'unknown'
+SORT_BATCH_SIZE = 100000
+
+
+class Event:
+    __slots__ = ['case', 'activity', 'time', 'author', 'commit', 'file', 'additions', 'deletions']
+
+    def __init__(self, case, activity, time, author, commit, file=None, additions=0, deletions=0):
+        self.case = case
+        self.activity = activity
+        self.time = time
+        self.author = author
+        self.commit = commit
+        self.file = file
+        self.additions = additions
+        self.deletions = deletions
+
+
+def get_branch_name(decoration):
+    """Returns the first ref of a git %d decoration like ' (HEAD -> master, origin/master)', or None."""
+    decoration = decoration.strip().strip('()')
+    if not decoration:
+        return None
+    ref = decoration.split(',')[0].strip()
+    for prefix in ('HEAD -> ', 'tag: '):
+        if ref.startswith(prefix):
+            ref = ref[len(prefix):]
+    return ref
+
+
+def get_activity(activity, author, path):
+    if activity == 'author':
+        return author
+    if path is None:
+        return MERGE_ACTIVITY
+    if activity == 'directory':
+        slash = path.find('/')
+        return path[:slash] if slash != -1 else '.'
+    return path[path.rfind('.'):]
+
+
+def iter_author_commits(data_container):
+    """Yields (author, commit) pairs of a data container in log order."""
+    authors = {}
+    for author in data_container.author_list:
+        for commit in author.commits:
+            authors[id(commit)] = author
+    for commit in data_container.commit_list:
+        yield authors[id(commit)], commit
+
+
+def iter_stream_commits(stream_parser):
+    """Yields (author, commit) pairs from a StreamParser, the parser still points at the author of a yielded commit."""
+    for commit in stream_parser:
+        yield stream_parser.current_author, commit
+
+
+def iter_events(author_commits, case='author', activity=None):
+    """Turns (author, commit) pairs into one event per file change, and one merge event per commit without any.
+
+    Commits without a branch decoration belong to the branch of the nearest decorated commit before them in the
+    log, which for the newest first order of git log is the branch tip they were committed under.
+    """
+    if case not in CASES:
+        raise ValueError('Unknown case %s' % case)
+    activity = activity or DEFAULT_ACTIVITIES[case]
+    if activity not in ACTIVITIES:
+        raise ValueError('Unknown activity %s' % activity)
+    branch = UNKNOWN_BRANCH
+    for author, commit in author_commits:
+        if case == 'branch':
+            branch = get_branch_name(commit.branch) or branch
+        changes = [(change.file.path.strip(), change.additions, change.deletions) for change in commit.file_changes]
+        for path, additions, deletions in changes or [(None, 0, 0)]:
+            if case == 'author':
+                case_id = author.author_email
+            elif case == 'file':
+                if path is None:
+                    continue
+                case_id = path
+            else:
+                case_id = branch
+            yield Event(case_id, get_activity(activity, author.author_email, path), commit.commit_time,
+                        author.author_email, commit.short_hash, path, additions, deletions)
+
+
+class CaseSorter:
+    """Groups events by case with an external merge sort, every case oldest event first.
+
+    XES nests the events in one trace per case, so they have to arrive grouped. Batches of batch_size events are
+    sorted and spilled to temporary files, iterating merges the files, so memory holds one batch at a time. Events
+    have to be added in log order, newest first like git log unless newest_first is False.
+    """
+    def __init__(self, batch_size=SORT_BATCH_SIZE, newest_first=True):
+        self.batch_size = batch_size
+        self.newest_first = newest_first
+        self.batch = []
+        self.files = []
+        self.count = 0
+
+    def add(self, event):
+        self.count += 1
+        order = -self.count if self.newest_first else self.count
+        self.batch.append((event.case, order, event.activity, event.time, event.author, event.commit, event.file,
+                           event.additions, event.deletions))
+        if len(self.batch) >= self.batch_size:
+            self.spill()
+
+    def add_events(self, events):
+        for event in events:
+            self.add(event)
+        return self
+
+    def spill(self):
+        self.batch.sort()
+        file = tempfile.TemporaryFile()
+        pickler = pickle.Pickler(file, pickle.HIGHEST_PROTOCOL)
+        for item in self.batch:
+            pickler.dump(item)
+            # Items are independent, without clearing the memo would keep every one of them.
+            pickler.clear_memo()
+        file.seek(0)
+        self.files.append(file)
+        self.batch = []
+
+    def read_file(self, file):
+        unpickler = pickle.Unpickler(file)
+        while True:
+            try:
+                yield unpickler.load()
+            except EOFError:
+                return
+
+    def __iter__(self):
+        self.batch.sort()
+        try:
+            for item in heapq.merge(self.batch, *[self.read_file(file) for file in self.files]):
+                case, _, activity, time, author, commit, file, additions, deletions = item
+                yield Event(case, activity, time, author, commit, file, additions, deletions)
+        finally:
+            for file in self.files:
+                file.close()
+            self.files = []
+            self.batch = []
+
+
+def group_by_case(events, batch_size=SORT_BATCH_SIZE, newest_first=True):
+    """Yields the events of a log grouped by case, every case oldest event first, see CaseSorter."""
+    return iter(CaseSorter(batch_size, newest_first).add_events(events))
+
+
+class DirectlyFollowsGraph:
+    """Directly-follows graph discovered in one pass over the events, keeping only the last event of every case.
+
+    Events of a case have to arrive in time order, newest first like git log unless newest_first is False. Every
+    edge counts how often its target directly followed its source in a case and the seconds in between.
+    """
+    def __init__(self, newest_first=True):
+        self.newest_first = newest_first
+        self.activities = {}
+        # (source, target) -> [frequency, total seconds, min seconds, max seconds]
+        self.edges = {}
+        self.last_events = {}
+        self.first_activities = {}
+
+    def add(self, event):
+        self.activities[event.activity] = self.activities.get(event.activity, 0) + 1
+        last = self.last_events.get(event.case)
+        if last is None:
+            self.first_activities[event.activity] = self.first_activities.get(event.activity, 0) + 1
+        else:
+            last_activity, last_time = last
+            if self.newest_first:
+                edge, seconds = (event.activity, last_activity), (last_time - event.time).total_seconds()
+            else:
+                edge, seconds = (last_activity, event.activity), (event.time - last_time).total_seconds()
+            counters = self.edges.get(edge)
+            if counters is None:
+                self.edges[edge] = [1, seconds, seconds, seconds]
+            else:
+                counters[0] += 1
+                counters[1] += seconds
+                if seconds < counters[2]:
+                    counters[2] = seconds
+                if seconds > counters[3]:
+                    counters[3] = seconds
+        self.last_events[event.case] = (event.activity, event.time)
+
+    def add_events(self, events):
+        for event in events:
+            self.add(event)
+        return self
+
+    def get_last_activities(self):
+        activities = {}
+        for activity, _ in self.last_events.values():
+            activities[activity] = activities.get(activity, 0) + 1
+        return activities
+
+    @property
+    def start_activities(self):
+        return self.get_last_activities() if self.newest_first else self.first_activities
+
+    @property
+    def end_activities(self):
+        return self.first_activities if self.newest_first else self.get_last_activities()
+
+    def get_dict(self):
+        edges = [{'source': source, 'target': target, 'frequency': frequency,
+                  'mean_seconds': total / frequency, 'min_seconds': minimum, 'max_seconds': maximum}
+                 for (source, target), (frequency, total, minimum, maximum) in self.edges.items()]
+        edges.sort(key=lambda edge: -edge['frequency'])
+        return {
+            'cases': len(self.last_events),
+            'activities': self.activities,
+            'start_activities': self.start_activities,
+            'end_activities': self.end_activities,
+            'edges': edges,
+        }
+
+    def write_json(self, path):
+        with open(path, 'w') as file:
+            json.dump(self.get_dict(), file, indent=2)
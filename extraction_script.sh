@@ -4,4 +4,4 @@
 cd ..
 git log --pretty=format:"start%n%h;%ae;%at;%cE;%ct;%d;%nstartcomment%n%s;%nend" --numstat > promingit/logs/project_gitlog.log
 cd promingit
-python main.py
\ No newline at end of file
+python main.py "$@"
\ No newline at end of file
@@ -0,0 +1,48 @@
+import subprocess
+
+import models
+from parser import GIT_LOG_FORMAT, Parser
+
+
+def git_log_command(repository_path, since=None, until=None, authors=None, max_count=None, file_types=False):
+    """Builds the git log command for the parser, by default it lists the same commits as the extracted log.
+
+    With file_types, the allowed file types (or the given list) become pathspecs and commits that touch no analysed
+    file are not listed at all, which also leaves out merge commits. History simplification stays off so no other
+    commits go missing.
+    """
+    if file_types is True:
+        file_types = models.ALLOWED_FILE_TYPES if models.ENFORCE_FILE_TYPES else []
+    command = ['git', '-C', repository_path, 'log', '--pretty=format:' + GIT_LOG_FORMAT, '--numstat']
+    if since:
+        command.append('--since=%s' % since)
+    if until:
+        command.append('--until=%s' % until)
+    for author in authors or []:
+        command.append('--author=%s' % author)
+    if max_count is not None:
+        command.append('--max-count=%d' % max_count)
+    if file_types:
+        command.extend(['--full-history', '--'])
+        command.extend('*%s' % file_type for file_type in file_types)
+    return command
+
+
+def stream_git_log(repository_path, **filters):
+    """Yields the lines of git log as git produces them, without writing the log to disk."""
+    command = git_log_command(repository_path, **filters)
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, universal_newlines=True)
+    try:
+        for line in process.stdout:
+            yield line
+    finally:
+        process.stdout.close()
+        return_code = process.wait()
+    if return_code:
+        raise subprocess.CalledProcessError(return_code, command)
+
+
+def read_repository(repository_path, hotspots=False, directories=False, **filters):
+    parser = Parser(hotspots=hotspots, directories=directories)
+    parser.read_cycle(stream_git_log(repository_path, **filters))
+    return parser.create_data_container()
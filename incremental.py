@@ -0,0 +1,245 @@
+import bisect
+import os
+import pickle
+
+from churn import ChurnIndex
+from data_container import DataContainer
+from events import iter_author_commits
+from models import File, InvalidFileType
+from parser import Parser
+from sessions import Sessions
+from statistics import RecordedAuthorPeriodStatistics, Statistics
+from tree import DirectoryTree
+from windowing import QUARTAL, bucket_commits, window_boundaries
+
+
+class AnalysisState:
+    def __init__(self, granularity):
+        self.granularity = granularity
+        self.data_container = DataContainer(author_list=[], author_dict={}, commit_list=[], file_list=[],
+                                            file_dict={}, file_change_list=[], churn_index=None,
+                                            directory_tree=None, renamed_paths={})
+        # Hashes of the analysed commits, every run reads the whole log and parses the commits missing here.
+        self.commit_hashes = set()
+        # Author records of every computed period, keyed by the period start, None holds the all time period.
+        self.author_records = {}
+        # Work sessions of every computed period, keyed like author_records.
+        self.sessions = {}
+
+
+class StateStore:
+    def __init__(self, path):
+        self.path = path
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return None
+        with open(self.path, 'rb') as file:
+            return pickle.load(file)
+
+    def save(self, state):
+        temporary_path = self.path + '.tmp'
+        with open(temporary_path, 'wb') as file:
+            pickle.dump(state, file, pickle.HIGHEST_PROTOCOL)
+        os.replace(temporary_path, self.path)
+
+
+class IncrementalParser(Parser):
+    """Parses only the commits whose hash is not in commit_hashes and merges them into an existing data container.
+
+    A merged branch can bring commits dated before the last analysed one, so the whole log is read and the new
+    commits take their place in log order. Analysed commits are skipped without parsing their comment and files.
+    The new commits are resolved with their own renames only, merge moves the stored changes of files they renamed.
+    """
+    def __init__(self, file_path, data_container, commit_hashes=()):
+        super().__init__()
+        self.data_container = data_container
+        self.author_dict = data_container.author_dict
+        self.author_list = data_container.author_list
+        self.file_dict = data_container.file_dict
+        self.file_list = data_container.file_list
+        if data_container.churn_index is not None:
+            self.churn_index = data_container.churn_index
+        if data_container.directory_tree is not None:
+            self.directory_tree = data_container.directory_tree
+        self.commit_hashes = commit_hashes
+        self.seen_commits = 0
+        self.skip_commit = False
+        self.log_hashes = []
+        self.new_author_commits = {}
+        self.renamed_author_commits = {}
+        self.file_path = file_path
+        self.open_file()
+
+    def init_commit_from_summary(self, line):
+        short_hash = line.split(';', 1)[0]
+        self.log_hashes.append(short_hash)
+        self.skip_commit = short_hash in self.commit_hashes
+        if self.skip_commit:
+            self.seen_commits += 1
+            return
+        super().init_commit_from_summary(line)
+
+    def init_comment(self, line):
+        if not self.skip_commit:
+            super().init_comment(line)
+
+    def init_file_change(self, line):
+        if not self.skip_commit:
+            super().init_file_change(line)
+
+    def store_commit(self, commit):
+        self.commit_list.append(commit)
+        self.new_author_commits.setdefault(self.current_author, []).append(commit)
+
+    def merge(self):
+        renamed = self.resolve_stored_renames()
+        data_container = self.data_container
+        data_container.commit_list[:0] = self.commit_list
+        data_container.file_change_list[:0] = self.file_change_list
+        for author, commits in self.new_author_commits.items():
+            author.commits[:0] = commits
+        if self.commit_list and self.commit_list[-1].short_hash != self.log_hashes[len(self.commit_list) - 1]:
+            # Some new commits come after analysed ones in the log, both runs are already sorted.
+            positions = dict((short_hash, index) for index, short_hash in enumerate(self.log_hashes))
+            get_position = lambda commit: positions[commit.short_hash]
+            data_container.commit_list.sort(key=get_position)
+            for author in self.new_author_commits:
+                author.commits.sort(key=get_position)
+        if renamed:
+            # The indexes hold the moved changes under the old paths, renames are rare enough to rebuild them.
+            author_commits = list(iter_author_commits(data_container))
+            if data_container.churn_index is not None:
+                data_container.churn_index = ChurnIndex().add_commits(author_commits)
+            if data_container.directory_tree is not None:
+                data_container.directory_tree = DirectoryTree().add_commits(author_commits)
+
+    def resolve_stored_renames(self):
+        """Moves the stored changes of files the new commits renamed to the newest path, like a full parse would."""
+        data_container = self.data_container
+        moved = dict((path, file_path) for path, file_path in self.renamed_paths.items() if path in self.file_dict)
+        for old_path, file_path in data_container.renamed_paths.items():
+            file_path = self.renamed_paths.get(file_path, file_path)
+            if old_path != file_path:
+                self.renamed_paths[old_path] = file_path
+        data_container.renamed_paths = self.renamed_paths
+        if not moved:
+            return False
+
+        for path, file_path in moved.items():
+            if file_path not in self.file_dict and file_path not in self.invalid_paths:
+                try:
+                    self.file_dict[file_path] = File(file_path)
+                    self.file_list.append(self.file_dict[file_path])
+                except InvalidFileType:
+                    self.invalid_paths.add(file_path)
+        dropped = set()
+        for author in self.author_list:
+            for commit in author.commits:
+                if not any(file_change.file.path in moved for file_change in commit.file_changes):
+                    continue
+                file_changes = []
+                for file_change in commit.file_changes:
+                    file_path = moved.get(file_change.file.path, file_change.file.path)
+                    if file_path in self.file_dict:
+                        file_change.file = self.file_dict[file_path]
+                        file_changes.append(file_change)
+                    else:
+                        dropped.add(id(file_change))
+                commit.file_changes = file_changes
+                commit.count_totals()
+                self.renamed_author_commits.setdefault(author, []).append(commit)
+        if dropped:
+            data_container.dropped_file_changes += len(dropped)
+            data_container.file_change_list[:] = [file_change for file_change in data_container.file_change_list
+                                                  if id(file_change) not in dropped]
+        # Old paths the new commits use again, e.g. for a new file, keep their File.
+        used_paths = set(file_change.file.path for file_change in self.file_change_list)
+        for path in moved:
+            if path not in used_paths:
+                self.file_list.remove(self.file_dict.pop(path))
+        return True
+
+    def get_changed_author_commits(self):
+        """Returns the new commits and the stored commits whose changes moved to a renamed file, per author."""
+        author_commits = dict((author, list(commits)) for author, commits in self.new_author_commits.items())
+        for author, commits in self.renamed_author_commits.items():
+            author_commits.setdefault(author, []).extend(commits)
+        return author_commits
+
+
+class IncrementalStatistics(Statistics):
+    """Recomputes only the authors and periods touched by the new commits, the rest comes from the state."""
+    def __init__(self, state, new_author_commits, serializer=None):
+        super().__init__(state.data_container, state.granularity, serializer)
+        self.state = state
+        self.new_author_commits = new_author_commits
+        self.reused_windows = 0
+
+    def generate_all_time_stats(self):
+        window_commits = dict((author.author_email, author.commits) for author in self.new_author_commits)
+        statistics = self.author_statistics_class(self.data_container, window_commits=window_commits)
+        records = dict((author.author, author) for author in self.state.author_records.get(None, []))
+        records.update((author.author, author) for author in statistics.author_records)
+        self.state.author_records[None] = [records[author.author_email] for author in self.data_container.author_list
+                                           if author.author_email in records]
+        # The sessions of all authors are one object, one vectorized pass over all commits redoes them.
+        self.state.sessions[None] = Sessions.from_commit_lists([author.commits for author in
+                                                                self.data_container.author_list if author.commits])
+        statistics = RecordedAuthorPeriodStatistics(self.state.author_records[None], sessions=self.state.sessions[None])
+        self.insert_author_statistics(statistics)
+        return statistics
+
+    def generate_quartal_statistics(self):
+        start_date, end_date = self.get_project_interval()
+        boundaries = window_boundaries(start_date, end_date, self.granularity)
+        new_commit_times = [commit.commit_time for commits in self.new_author_commits.values() for commit in commits]
+        if new_commit_times:
+            first_changed = bisect.bisect_right(boundaries, min(new_commit_times)) - 1
+            buckets = bucket_commits(self.data_container.author_list, boundaries, since=boundaries[first_changed])
+        else:
+            first_changed = len(boundaries)
+            buckets = None
+
+        for index, (time_from, time_to) in enumerate(zip(boundaries, boundaries[1:])):
+            if index < first_changed and time_from in self.state.author_records:
+                stats = RecordedAuthorPeriodStatistics(self.state.author_records[time_from], time_from, time_to,
+                                                       self.state.sessions.get(time_from))
+                self.reused_windows += 1
+            else:
+                stats = self.author_statistics_class(self.data_container, time_from=time_from, time_to=time_to,
+                                                     window_commits=buckets[index] if buckets else None)
+                self.state.author_records[time_from] = stats.author_records
+                self.state.sessions[time_from] = stats.sessions
+            project_stats = self.project_statistics_class(self.data_container, stats, time_from=time_from, time_to=time_to)
+            self.insert_period(stats, project_stats)
+
+
+def analyse_incrementally(log_path, state_path, granularity=QUARTAL, serializer=None, hotspots=False,
+                          directories=False):
+    store = StateStore(state_path)
+    state = store.load()
+    if state is None or state.granularity != granularity:
+        state = AnalysisState(granularity)
+    if hotspots and state.data_container.churn_index is None:
+        # Asked for the first time, index the stored history once and keep the index up to date from now on.
+        state.data_container.churn_index = ChurnIndex().add_commits(iter_author_commits(state.data_container))
+    if directories and state.data_container.directory_tree is None:
+        state.data_container.directory_tree = DirectoryTree().add_commits(iter_author_commits(state.data_container))
+
+    parser = IncrementalParser(log_path, state.data_container, state.commit_hashes)
+    if parser.seen_commits < len(state.commit_hashes):
+        # Analysed commits are missing from the log, the history was rewritten, start over.
+        state = AnalysisState(granularity)
+        if hotspots:
+            state.data_container.churn_index = ChurnIndex()
+        if directories:
+            state.data_container.directory_tree = DirectoryTree()
+        parser = IncrementalParser(log_path, state.data_container)
+    parser.merge()
+
+    statistics = IncrementalStatistics(state, parser.get_changed_author_commits(), serializer)
+    statistics.generate_statistics()
+    state.commit_hashes.update(commit.short_hash for commit in parser.commit_list)
+    store.save(state)
+    return statistics
@@ -0,0 +1,77 @@
+import contextlib
+import cProfile
+import json
+import time
+import tracemalloc
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+def get_max_rss_mb():
+    if resource is None:
+        return None
+    # ru_maxrss is in kilobytes on linux.
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+class Instrumentation:
+    """Collects wall time, cpu time and memory of every run phase together with throughput counters.
+
+    Memory is the process peak rss after the phase, with trace_memory also the python allocation peak of the
+    phase itself. With profile_path the whole instrumented run is profiled and dumped there for pstats.
+    """
+    def __init__(self, trace_memory=False, profile_path=None):
+        self.trace_memory = trace_memory
+        self.profile_path = profile_path
+        self.profiler = cProfile.Profile() if profile_path else None
+        self.phases = []
+        # Phase name -> counter name -> value, phases like parse and statistics both count commits.
+        self.counters = {}
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        if self.trace_memory:
+            tracemalloc.start()
+        if self.profiler:
+            self.profiler.enable()
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        phase = {'phase': name}
+        try:
+            yield phase
+        finally:
+            phase['wall_seconds'] = time.perf_counter() - wall_start
+            phase['cpu_seconds'] = time.process_time() - cpu_start
+            if self.profiler:
+                self.profiler.disable()
+            if self.trace_memory:
+                phase['peak_traced_mb'] = tracemalloc.get_traced_memory()[1] / 1e6
+                tracemalloc.stop()
+            phase['max_rss_mb'] = get_max_rss_mb()
+            self.phases.append(phase)
+
+    def count(self, phase, name, value, rate=True):
+        phase[name] = value
+        if rate and value is not None and phase.get('wall_seconds'):
+            phase[name + '_per_second'] = value / phase['wall_seconds']
+        self.counters.setdefault(phase['phase'], {})[name] = value
+
+    def report(self):
+        return {
+            'phases': self.phases,
+            'counters': self.counters,
+            'wall_seconds': sum(phase['wall_seconds'] for phase in self.phases),
+            'cpu_seconds': sum(phase['cpu_seconds'] for phase in self.phases),
+            'max_rss_mb': get_max_rss_mb(),
+        }
+
+    def write_report(self, path):
+        with open(path, 'w') as file:
+            json.dump(self.report(), file, indent=2)
+
+    def dump_profile(self):
+        if self.profiler:
+            self.profiler.dump_stats(self.profile_path)
@@ -1,18 +1,257 @@
-from parser import Parser
+import argparse
+import datetime
+import json
+import os
+
+import sessions
+from compression import strip_compression_extension
+from coupling import MAX_FILES_PER_COMMIT, ChangeCoupling
+from events import ACTIVITIES, CASES, CaseSorter, DirectlyFollowsGraph, iter_author_commits, iter_events
+from instrumentation import Instrumentation
+from parser import ParallelParser, Parser
+from report import REPORT_PATH, Report
+from serializer import EventSerializer, StreamingSerializer
 from statistics import Statistics
 from visualisation import Visualisation
+from windowing import QUARTAL, parse_granularity
+
+
+def get_sizes(data_container):
+    if hasattr(data_container, 'commit_list'):
+        return len(data_container.commit_list), len(data_container.file_change_list)
+    return data_container.number_of_commits, len(data_container.change_commit)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='A process mining tool for analyzing git repositories.')
+    arg_parser.add_argument('log_path', nargs='?', default='logs/project_gitlog.log')
+    arg_parser.add_argument('--columnar', action='store_true', help='compute statistics with the numpy backend')
+    arg_parser.add_argument('--granularity', type=parse_granularity, default=QUARTAL,
+                            help='period length, one of day, week, month, quarter or a number of days (default 90)')
+    arg_parser.add_argument('--session-gap', type=float, default=8,
+                            help='hours without commits that end a work session, used for commits/day (default 8)')
+    arg_parser.add_argument('--session-span', type=float, default=18,
+                            help='hours after which a work session is split, used for commits/day (default 18)')
+    arg_parser.add_argument('--sessions', metavar='JSON',
+                            help='write the number, lengths and commits of the work sessions of every period to this '
+                                 'file')
+    arg_parser.add_argument('--repository', help='read the history straight from this git repository instead of a log')
+    arg_parser.add_argument('--since', help='only analyse commits after this date, with --repository')
+    arg_parser.add_argument('--until', help='only analyse commits before this date, with --repository')
+    arg_parser.add_argument('--author', action='append', help='only analyse commits of this author, with --repository')
+    arg_parser.add_argument('--max-count', type=int, help='only analyse this many newest commits, with --repository')
+    arg_parser.add_argument('--only-file-types', action='store_true',
+                            help='only read commits touching the analysed file types, with --repository, leaves out '
+                                 'merge commits')
+    arg_parser.add_argument('--processes', type=int, help='parse the log and evaluate the periods in this many worker processes')
+    arg_parser.add_argument('--save-snapshot', help='write the parsed history to a binary snapshot file')
+    arg_parser.add_argument('--load-snapshot', help='read the history from a binary snapshot instead of the log')
+    arg_parser.add_argument('--output', help='stream the results to this file, as ndjson for .ndjson or .jsonl files '
+                                            'and as a json array otherwise, compressed for .gz, .bz2, .xz or .zst')
+    arg_parser.add_argument('--html', default=REPORT_PATH,
+                            help='write the html report here, its data goes to a _shards folder next to it '
+                                 '(default %s)' % REPORT_PATH)
+    arg_parser.add_argument('--no-html', action='store_true', help='skip writing the html report')
+    arg_parser.add_argument('--state', help='state file, when given only commits newer than the stored ones are analysed')
+    arg_parser.add_argument('--hotspots', type=int, metavar='K', help='print the K most churned files')
+    arg_parser.add_argument('--directories', nargs='?', const='', metavar='PREFIX',
+                            help='print churn, changes and test ratio of every directory under PREFIX '
+                                 '(default the top level)')
+    arg_parser.add_argument('--coupling', metavar='CSV',
+                            help='write the files that most often change together with every file to this csv file')
+    arg_parser.add_argument('--coupling-top', type=int, default=5, help='coupled files written per file (default 5)')
+    arg_parser.add_argument('--coupling-min-support', type=int, default=2,
+                            help='commits two files must share to count as coupled (default 2)')
+    arg_parser.add_argument('--coupling-min-confidence', type=float, default=0.0,
+                            help='share of the commits of a file that must also change the coupled file (default 0)')
+    arg_parser.add_argument('--coupling-max-files', type=int, default=MAX_FILES_PER_COMMIT,
+                            help='skip commits changing more files than this for the coupling (default %d)'
+                                 % MAX_FILES_PER_COMMIT)
+    arg_parser.add_argument('--events', metavar='PATH',
+                            help='export an event log, as xes for .xes files and as csv otherwise')
+    arg_parser.add_argument('--event-case', choices=CASES, default='author', help='case of the exported events')
+    arg_parser.add_argument('--event-activity', choices=ACTIVITIES,
+                            help='activity of the exported events (default author for file and branch cases, '
+                                 'directory otherwise)')
+    arg_parser.add_argument('--dfg', metavar='JSON', help='write the directly-follows graph of the events to this file')
+    arg_parser.add_argument('--sketches', metavar='JSON',
+                            help='write estimated distinct authors and files and commit size percentiles of every '
+                                 'period to this file')
+    arg_parser.add_argument('--rolling', metavar='JSON',
+                            help='write the project statistics of sliding windows to this file')
+    arg_parser.add_argument('--rolling-width', type=int, default=90, metavar='DAYS',
+                            help='length of the sliding windows in days (default 90)')
+    arg_parser.add_argument('--rolling-step', type=int, default=7, metavar='DAYS',
+                            help='days the sliding windows advance by (default 7)')
+    arg_parser.add_argument('--report', action='store_true',
+                            help='write timings, memory and throughput of every phase to a json report next to the '
+                                 'results')
+    arg_parser.add_argument('--trace-memory', action='store_true',
+                            help='add the python allocation peak of every phase to the report, makes the run slower')
+    arg_parser.add_argument('--profile', action='store_true',
+                            help='dump a cProfile of the run to result.prof, or next to the --output file')
+    args = arg_parser.parse_args()
+    if args.state and (args.columnar or args.load_snapshot or args.repository):
+        arg_parser.error('--state can not be combined with --columnar, --load-snapshot or --repository')
+    repository_options = [('--since', args.since), ('--until', args.until), ('--author', args.author),
+                          ('--max-count', args.max_count), ('--only-file-types', args.only_file_types)]
+    given = [name for name, value in repository_options if value is not None and value is not False]
+    if given and not args.repository:
+        arg_parser.error('%s can only be used with --repository' % ', '.join(given))
+    # The columnar container of a snapshot or of a parallel columnar parse keeps no objects and no indexes.
+    object_options = [('--hotspots', args.hotspots), ('--directories', args.directories),
+                      ('--coupling', args.coupling), ('--events', args.events), ('--dfg', args.dfg),
+                      ('--sketches', args.sketches)]
+    given = [name for name, value in object_options if value is not None]
+    if given and (args.load_snapshot or args.processes and args.columnar):
+        arg_parser.error('%s can not be combined with --load-snapshot or with --processes and --columnar'
+                         % ', '.join(given))
+    if args.trace_memory and not args.report:
+        arg_parser.error('--trace-memory can only be used with --report')
+    if args.max_count is not None and args.max_count <= 0:
+        arg_parser.error('--max-count must be positive')
+    if args.rolling_width <= 0 or args.rolling_step <= 0:
+        arg_parser.error('--rolling-width and --rolling-step must be positive')
+    if args.session_gap <= 0 or args.session_span <= 0:
+        arg_parser.error('--session-gap and --session-span must be positive')
+    sessions.GAP_LIMIT = args.session_gap * 60 * 60
+    sessions.SPAN_LIMIT = args.session_span * 60 * 60
+    serializer = StreamingSerializer.for_path(args.output) if args.output else None
+    report_base = os.path.splitext(strip_compression_extension(args.output))[0] if args.output else 'result'
+    instrumentation = Instrumentation(args.trace_memory, report_base + '.prof' if args.profile else None)
 
-parser = Parser('logs/project_gitlog.log')
-data_container = parser.create_data_container()
+    if args.state:
+        from incremental import analyse_incrementally
+        with instrumentation.phase('incremental analysis') as phase:
+            statistics = analyse_incrementally(args.log_path, args.state, args.granularity, serializer,
+                                               bool(args.hotspots), args.directories is not None)
+        instrumentation.count(phase, 'windows', len(statistics.quartal_statistics))
+        instrumentation.count(phase, 'reused_windows', statistics.reused_windows, rate=False)
+        data_container = statistics.data_container
+    else:
+        with instrumentation.phase('parse') as phase:
+            if args.load_snapshot:
+                from snapshot import load_snapshot
+                data_container = load_snapshot(args.load_snapshot)
+                args.columnar = True
+            elif args.repository:
+                from git_log import read_repository
+                data_container = read_repository(args.repository, bool(args.hotspots), args.directories is not None,
+                                                 since=args.since, until=args.until, authors=args.author,
+                                                 max_count=args.max_count, file_types=args.only_file_types)
+            elif args.processes and args.columnar:
+                from columnar import ColumnarDataContainer
+                data_container = ColumnarDataContainer.from_log(args.log_path, args.processes)
+            else:
+                indexes = bool(args.hotspots), args.directories is not None
+                if args.processes:
+                    parser = ParallelParser(args.log_path, args.processes, *indexes)
+                else:
+                    parser = Parser(args.log_path, *indexes)
+                data_container = parser.create_data_container()
+        commits, file_changes = get_sizes(data_container)
+        instrumentation.count(phase, 'lines', getattr(data_container, 'number_of_lines', None))
+        instrumentation.count(phase, 'commits', commits)
+        instrumentation.count(phase, 'file_changes', file_changes)
+        instrumentation.count(phase, 'dropped_file_changes', getattr(data_container, 'dropped_file_changes', None),
+                              rate=False)
+        if args.save_snapshot:
+            from snapshot import save_snapshot
+            with instrumentation.phase('snapshot'):
+                save_snapshot(data_container, args.save_snapshot)
 
-# Serailize data for
+        # Serailize data for
 
-# Create statistics
-statistics = Statistics(data_container)
-statistics.generate_statistics()
-statistics.print_statistics()
-visualisation = Visualisation(statistics)
-#
-serializer = statistics.general_serializer
-json_data = serializer.serialize()
+        # Create statistics
+        with instrumentation.phase('statistics') as phase:
+            if args.columnar:
+                from columnar import ColumnarStatistics
+                statistics = ColumnarStatistics(data_container, args.granularity, serializer, args.processes)
+            else:
+                statistics = Statistics(data_container, args.granularity, serializer, args.processes)
+            statistics.generate_statistics()
+        instrumentation.count(phase, 'commits', commits)
+        instrumentation.count(phase, 'windows', len(statistics.quartal_statistics))
+    statistics.print_statistics()
+    # Columnar statistics convert the container, the indexes stay with the parsed one.
+    if args.hotspots:
+        data_container.churn_index.print_top(args.hotspots)
+        print(" ")
+    if args.directories is not None:
+        data_container.directory_tree.print_rollup(args.directories)
+        print(" ")
+    if args.coupling:
+        with instrumentation.phase('coupling') as phase:
+            coupling = ChangeCoupling(args.coupling_max_files).add_commits(data_container.commit_list)
+            coupling.write_csv(args.coupling, args.coupling_top, args.coupling_min_support,
+                               args.coupling_min_confidence)
+        instrumentation.count(phase, 'commits', coupling.commits)
+        instrumentation.count(phase, 'skipped_commits', coupling.skipped_commits, rate=False)
+        instrumentation.count(phase, 'file_pairs', len(coupling.pairs), rate=False)
+    if args.events or args.dfg:
+        with instrumentation.phase('events') as phase:
+            events = iter_events(iter_author_commits(data_container), args.event_case, args.event_activity)
+            event_serializer = EventSerializer.for_path(args.events) if args.events else None
+            case_sorter = CaseSorter() if event_serializer is not None and event_serializer.format == 'xes' else None
+            graph = DirectlyFollowsGraph()
+            number_of_events = 0
+            for event in events:
+                if case_sorter is not None:
+                    case_sorter.add(event)
+                elif event_serializer is not None:
+                    event_serializer.insert(event)
+                graph.add(event)
+                number_of_events += 1
+            if case_sorter is not None:
+                for event in case_sorter:
+                    event_serializer.insert(event)
+            if event_serializer is not None:
+                event_serializer.close()
+            if args.dfg:
+                graph.write_json(args.dfg)
+        instrumentation.count(phase, 'events', number_of_events)
+        instrumentation.count(phase, 'directly_follows_edges', len(graph.edges), rate=False)
+    if args.sketches:
+        from sketches import SketchIndex
+        with instrumentation.phase('sketches') as phase:
+            # Anchored like the period statistics, at the oldest commit.
+            sketch_index = SketchIndex(args.granularity, origin=statistics.get_project_interval()[0])
+            sketch_index.add_commits(iter_author_commits(data_container))
+            sketch_index.write_json(args.sketches)
+        instrumentation.count(phase, 'windows', len(sketch_index.windows), rate=False)
+    if args.sessions:
+        with instrumentation.phase('sessions') as phase:
+            summaries = statistics.session_summaries()
+            with open(args.sessions, 'w') as file:
+                json.dump([{'content': content, 'meta': {'time_from': str(time_from), 'time_to': str(time_to)}}
+                           for time_from, time_to, content in summaries], file)
+        instrumentation.count(phase, 'windows', len(summaries), rate=False)
+    if args.rolling:
+        with instrumentation.phase('rolling windows') as phase:
+            rolling = statistics.rolling_statistics(datetime.timedelta(days=args.rolling_width),
+                                                    datetime.timedelta(days=args.rolling_step))
+            with open(args.rolling, 'w') as file:
+                json.dump([{'content': content, 'meta': {'time_from': str(time_from), 'time_to': str(time_to)}}
+                           for time_from, time_to, content in rolling], file)
+        instrumentation.count(phase, 'windows', len(rolling), rate=False)
+    with instrumentation.phase('visualisation') as phase:
+        visualisation = Visualisation(statistics)
+    instrumentation.count(phase, 'charts_rendered', len(visualisation.rendered), rate=False)
+    if not args.no_html:
+        with instrumentation.phase('html report') as phase:
+            report = Report(statistics, args.html)
+        instrumentation.count(phase, 'shards', len(report.shards), rate=False)
+        instrumentation.count(phase, 'shards_written', len(report.written), rate=False)
+    #
+    with instrumentation.phase('serialization'):
+        if serializer is not None:
+            serializer.close()
+        else:
+            serializer = statistics.general_serializer
+            json_data = serializer.serialize()
+    if args.report:
+        instrumentation.write_report(report_base + '.report.json')
+    instrumentation.dump_profile()
 
+if __name__ == '__main__':
+    main()
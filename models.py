@@ -1,4 +1,5 @@
 import datetime
+import sys
 
 ALLOWED_FILE_TYPES = ['.py', '.html', '.js', '.css', '.rb']
 ENFORCE_FILE_TYPES = True
@@ -9,6 +10,8 @@ class InvalidFileType(Exception):
 
 
 class FileChange:
+    __slots__ = ['file', 'additions', 'deletions', 'changes', 'new_lines']
+
     def __init__(self, file, additions, deletions):
         self.file = file
         try:
@@ -24,21 +27,29 @@ class FileChange:
 
 
 class File:
+    __slots__ = ['path', 'is_test']
+
     def __init__(self, path):
-        self.file_type = path[path.rfind('.'):-1]
-        if ENFORCE_FILE_TYPES is True and self.file_type not in ALLOWED_FILE_TYPES:
+        file_type = path[path.rfind('.'):-1]
+        if ENFORCE_FILE_TYPES is True and file_type not in ALLOWED_FILE_TYPES:
             raise InvalidFileType
-        self.path = path
-        self.name = path[path.rfind('/')+1:]
+        self.path = sys.intern(path)
+        self.is_test = 'test' in self.name[:4] or 'spec.rb' in self.name
 
     @property
-    def is_test(self):
-        return 'test' in self.name[:4] or 'spec.rb' in self.name
+    def name(self):
+        return self.path[self.path.rfind('/')+1:]
+
+    @property
+    def file_type(self):
+        return self.path[self.path.rfind('.'):-1]
 
 
 class Author:
+    __slots__ = ['author_email', 'commits']
+
     def __init__(self, author_email):
-        self.author_email = author_email
+        self.author_email = sys.intern(author_email)
         self.commits = []
 
     def __str__(self):
@@ -46,43 +57,42 @@ class Author:
 
 
 class Commit:
+    __slots__ = ['short_hash', 'author_time', 'commit_email', 'commit_time', 'branch', 'comment', 'file_changes',
+                 'number_of_additions', 'number_of_deletions', 'number_of_new_lines', 'number_of_test_new_lines']
+
     def __init__(self, short_hash, author_time, commit_email, commit_time, branch):
         self.short_hash = short_hash
         self.author_time = datetime.datetime.fromtimestamp(float(author_time))
-        self.commit_email = commit_email
+        self.commit_email = sys.intern(commit_email)
         self.commit_time = datetime.datetime.fromtimestamp(float(commit_time))
-        self.branch = branch
+        self.branch = sys.intern(branch)
         self.comment = ''
         self.file_changes = []
+        self.number_of_additions = 0
+        self.number_of_deletions = 0
+        self.number_of_new_lines = 0
+        self.number_of_test_new_lines = 0
+
+    def add_file_change(self, file_change):
+        self.file_changes.append(file_change)
+        self.number_of_additions += file_change.additions
+        self.number_of_deletions += file_change.deletions
+        self.number_of_new_lines += file_change.new_lines
+        if file_change.file.is_test:
+            self.number_of_test_new_lines += file_change.new_lines
+
+    def count_totals(self):
+        """Recomputes the totals, needed when file changes are moved to another file, e.g. a renamed one."""
+        file_changes = self.file_changes
+        self.file_changes = []
+        self.number_of_additions = self.number_of_deletions = 0
+        self.number_of_new_lines = self.number_of_test_new_lines = 0
+        for file_change in file_changes:
+            self.add_file_change(file_change)
 
     @property
     def number_of_changes(self):
-        changes = 0
-        for change in self.file_changes:
-            changes += change.additions + change.deletions
-        return changes
-
-    @property
-    def number_of_new_lines(self):
-        new_lines = 0
-        for change in self.file_changes:
-            new_lines += change.new_lines
-        return new_lines
-
-    @property
-    def number_of_deletions(self):
-        deletions = 0
-        for change in self.file_changes:
-            deletions += change.deletions
-        return deletions
-
-    @property
-    def number_of_test_new_lines(self):
-        new_lines = 0
-        for change in self.file_changes:
-            if change.file.is_test:
-                new_lines += change.new_lines
-        return new_lines
+        return self.number_of_additions + self.number_of_deletions
 
     @property
     def is_merge_commit(self):
@@ -92,6 +102,28 @@ class Commit:
         return "%s %s" % (self.short_hash, self.commit_time)
 
 
+class AuthorRecord:
+    """Statistics of one author in one period, read only once created so periods can be shared and cached."""
+    fields = ['author', 'commit_number', 'all_new_lines', 'all_deleted_lines', 'commits_per_day',
+              'files_per_commit', 'lines_per_commit', 'commits_under_25', 'commits_above_500',
+              'test_line_number', 'test_line_ratio', 'merge_commits']
+    __slots__ = fields
+
+    def __init__(self, **values):
+        for field in self.fields:
+            object.__setattr__(self, field, values.get(field))
+
+    def __setattr__(self, name, value):
+        raise AttributeError('AuthorRecord is read only')
+
+    def __getstate__(self):
+        return dict((field, getattr(self, field)) for field in self.fields)
+
+    def __setstate__(self, state):
+        for field in self.fields:
+            object.__setattr__(self, field, state.get(field))
+
+
 class Project:
     def __init__(self, time_from, time_to):
         self.time_from = time_from
@@ -1,5 +1,14 @@
+import io
+import multiprocessing
+import os
+
+from churn import ChurnIndex
+from compression import detect_compression, open_text
 from data_container import DataContainer
 from models import Commit, Author, File, FileChange, InvalidFileType
+from tree import DirectoryTree, parse_rename
+
+GIT_LOG_FORMAT = 'start%n%h;%ae;%at;%cE;%ct;%d;%nstartcomment%n%s;%nend'
 
 
 class Helpers:
@@ -9,7 +18,11 @@ class Helpers:
 
 
 class Parser:
-    def __init__(self, file_path):
+    """Parses a git log into a DataContainer.
+
+    With hotspots the per file churn index and with directories the directory tree are built along the way.
+    """
+    def __init__(self, file_path=None, hotspots=False, directories=False):
         self.file_path = file_path
         self.summary_start = False
         self.comment_start = False
@@ -20,18 +33,27 @@ class Parser:
         self.author_list = []
         self.commit_list = []
         self.current_author = None
-        self.open_file()
+        self.current_commit = None
+        self.number_of_lines = 0
+        self.dropped_file_changes = 0
+        self.invalid_paths = set()
+        self.churn_index = ChurnIndex() if hotspots else None
+        self.directory_tree = DirectoryTree() if directories else None
+        # Renamed path -> the newest path of the file, git log lists the rename before the older changes.
+        self.renamed_paths = {}
+        if self.file_path is not None:
+            self.open_file()
 
     def open_file(self):
-        with open(self.file_path, 'r') as file:
+        with open_text(self.file_path) as file:
             self.read_cycle(file)
 
-    def read_cycle(self, file):
-        lines = file.readlines()
+    def read_cycle(self, lines):
         for line in lines:
             self.process_line(line)
 
     def process_line(self, line):
+        self.number_of_lines += 1
         if len(line) <= 1:
             return
 
@@ -53,36 +75,62 @@ class Parser:
         commit_parameters, author_parameters = self.map_parameters(line)
 
         commit = Commit(**commit_parameters)
-        self.commit_list.append(commit)
+        self.current_commit = commit
 
         if not author_parameters['author_email'] in self.author_dict:
             author = Author(**author_parameters)
             self.author_list.append(author)
             self.author_dict[author.author_email] = author
         self.current_author = self.author_dict[author_parameters['author_email']]
+        self.store_commit(commit)
+
+    def store_commit(self, commit):
+        self.commit_list.append(commit)
         self.current_author.commits.append(commit)
 
     def init_comment(self, line):
-        self.current_author.commits[-1].comment += "%s " % line
+        self.current_commit.comment += "%s " % line
 
     def init_file_change(self, line):
         parameters = line.split('\t')
         additions, deletions, file_path = parameters
+        file_path = self.resolve_path(file_path)
 
         if not file_path in self.file_dict:
+            if file_path in self.invalid_paths:
+                self.dropped_file_changes += 1
+                return
             try:
                 file = File(file_path)
                 self.file_dict[file_path] = file
                 self.file_list.append(file)
             except InvalidFileType:
+                self.invalid_paths.add(file_path)
+                self.dropped_file_changes += 1
                 return
 
         file = self.file_dict[file_path]
 
         file_change = FileChange(file, additions, deletions)
-        self.file_change_list.append(file_change)
+        self.store_file_change(file_change)
+        if self.churn_index is not None:
+            self.churn_index.add(file_change, self.current_author, self.current_commit)
+        if self.directory_tree is not None:
+            self.directory_tree.add(file_change, self.current_author, self.current_commit)
 
-        self.current_author.commits[-1].file_changes.append(file_change)
+    def resolve_path(self, file_path):
+        rename = parse_rename(file_path)
+        if rename is not None:
+            old_path, file_path = rename
+            file_path = self.renamed_paths.get(file_path, file_path)
+            if old_path != file_path:
+                self.renamed_paths[old_path] = file_path
+            return file_path
+        return self.renamed_paths.get(file_path, file_path)
+
+    def store_file_change(self, file_change):
+        self.file_change_list.append(file_change)
+        self.current_commit.add_file_change(file_change)
 
     def map_parameters(self, line):
         params = line.split(';')[:6]
@@ -114,6 +162,158 @@ class Parser:
             commit_list=self.commit_list,
             file_list=self.file_list,
             file_dict=self.file_dict,
-            file_change_list=self.file_change_list
+            file_change_list=self.file_change_list,
+            number_of_lines=self.number_of_lines,
+            dropped_file_changes=self.dropped_file_changes,
+            churn_index=self.churn_index,
+            directory_tree=self.directory_tree,
+            renamed_paths=self.renamed_paths
         )
 
+
+
+class StreamParser(Parser):
+    """Yields each Commit as soon as the next start marker arrives, without keeping the history in memory.
+
+    The source is either a path or any iterable of log lines, e.g. sys.stdin or a git log subprocess stdout.
+    Authors and files are still collected in author_dict and file_dict, commits and file changes are not.
+    """
+    def __init__(self, source):
+        super().__init__()
+        self.source = source
+
+    def __iter__(self):
+        if isinstance(self.source, str):
+            with open_text(self.source) as file:
+                yield from self.iter_commits(file)
+        else:
+            yield from self.iter_commits(self.source)
+
+    def iter_commits(self, lines):
+        for line in lines:
+            if not self.summary_start and self.is_start(line) and self.current_commit is not None:
+                yield self.current_commit
+                self.current_commit = None
+            self.process_line(line)
+        if self.current_commit is not None:
+            yield self.current_commit
+            self.current_commit = None
+
+    def store_commit(self, commit):
+        pass
+
+    def store_file_change(self, file_change):
+        self.current_commit.add_file_change(file_change)
+
+
+def find_chunks(file_path, number_of_chunks):
+    """Splits the log into byte ranges that each begin at a start line."""
+    size = os.path.getsize(file_path)
+    boundaries = [0]
+    with open(file_path, 'rb') as file:
+        for index in range(1, number_of_chunks):
+            file.seek(max(size * index // number_of_chunks, boundaries[-1]))
+            file.readline()
+            position = file.tell()
+            line = file.readline()
+            while line and line.rstrip(b'\r\n') != b'start':
+                position = file.tell()
+                line = file.readline()
+            if not line:
+                break
+            boundaries.append(position)
+    boundaries.append(size)
+    return [(begin, end) for begin, end in zip(boundaries, boundaries[1:]) if end > begin]
+
+
+def parse_chunk(file_path, begin, end, hotspots=False, directories=False):
+    with open(file_path, 'rb') as file:
+        file.seek(begin)
+        data = file.read(end - begin)
+    parser = Parser(hotspots=hotspots, directories=directories)
+    parser.read_cycle(io.TextIOWrapper(io.BytesIO(data)))
+    return parser.create_data_container()
+
+
+class ParallelParser(Parser):
+    """Parses chunks of the log in a process pool and merges them back in log order."""
+    def __init__(self, file_path, processes=None, hotspots=False, directories=False):
+        self.processes = processes or os.cpu_count()
+        super().__init__(file_path, hotspots, directories)
+
+    def open_file(self):
+        if detect_compression(self.file_path) is not None:
+            # Compressed logs can not be split at byte offsets.
+            return super().open_file()
+        chunks = find_chunks(self.file_path, self.processes)
+        with multiprocessing.Pool(min(self.processes, len(chunks))) as pool:
+            partials = pool.starmap(parse_chunk, [(self.file_path, begin, end, self.churn_index is not None,
+                                                   self.directory_tree is not None) for begin, end in chunks])
+        for partial in partials:
+            self.merge(partial)
+
+    def merge(self, data_container):
+        self.number_of_lines += data_container.number_of_lines
+        self.dropped_file_changes += data_container.dropped_file_changes
+        # Older chunks resolve renames among themselves, the newer chunks merged so far resolve them further.
+        for old_path, file_path in data_container.renamed_paths.items():
+            file_path = self.renamed_paths.get(file_path, file_path)
+            if old_path != file_path:
+                self.renamed_paths[old_path] = file_path
+        # Partial path -> newest path, None when the file was renamed to a dropped file type.
+        files = {}
+        for file in data_container.file_list:
+            file_path = self.renamed_paths.get(file.path, file.path)
+            if file_path not in self.file_dict and file_path not in self.invalid_paths:
+                try:
+                    self.file_dict[file_path] = file if file_path == file.path else File(file_path)
+                    self.file_list.append(self.file_dict[file_path])
+                except InvalidFileType:
+                    self.invalid_paths.add(file_path)
+            files[file.path] = file_path if file_path in self.file_dict else None
+        # Changes of renamed files move to the newest path, their commit totals and index entries are redone.
+        renamed_changes = []
+        dropped = set()
+        for author in data_container.author_list:
+            for commit in author.commits:
+                renamed = False
+                file_changes = []
+                for file_change in commit.file_changes:
+                    file_path = files[file_change.file.path]
+                    if file_path == file_change.file.path:
+                        file_change.file = self.file_dict[file_path]
+                        file_changes.append(file_change)
+                        continue
+                    renamed = True
+                    if file_path is None:
+                        dropped.add(id(file_change))
+                        continue
+                    file_change.file = self.file_dict[file_path]
+                    file_changes.append(file_change)
+                    renamed_changes.append((file_change, author, commit))
+                if renamed:
+                    commit.file_changes = file_changes
+                    commit.count_totals()
+        renamed_paths = set(path for path, file_path in files.items() if file_path != path)
+        if self.churn_index is not None:
+            self.churn_index.merge(data_container.churn_index, renamed_paths)
+        if self.directory_tree is not None:
+            self.directory_tree.merge(data_container.directory_tree, set(path.strip() for path in renamed_paths))
+        for file_change, author, commit in renamed_changes:
+            if self.churn_index is not None:
+                self.churn_index.add(file_change, author, commit)
+            if self.directory_tree is not None:
+                self.directory_tree.add(file_change, author, commit)
+        if dropped:
+            self.dropped_file_changes += len(dropped)
+            self.file_change_list.extend(file_change for file_change in data_container.file_change_list
+                                         if id(file_change) not in dropped)
+        else:
+            self.file_change_list.extend(data_container.file_change_list)
+        self.commit_list.extend(data_container.commit_list)
+        for author in data_container.author_list:
+            if author.author_email in self.author_dict:
+                self.author_dict[author.author_email].commits.extend(author.commits)
+            else:
+                self.author_dict[author.author_email] = author
+                self.author_list.append(author)
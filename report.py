@@ -0,0 +1,198 @@
+import hashlib
+import json
+import os
+
+from serializer import AuthorSerializer, ProjectSerializer
+from visualisation import IMAGE_FOLDER
+
+REPORT_PATH = 'result.html'
+
+PAGE = '''<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>ProMinGit report</title>
+<style>
+body { font-family: sans-serif; margin: 2em; }
+table { border-collapse: collapse; margin: 1em 0; }
+td, th { border: 1px solid #ccc; padding: 2px 6px; text-align: right; }
+th { background: #eee; }
+tr.link { cursor: pointer; }
+tr.link:hover { background: #eef; }
+img { max-width: 32%; }
+</style>
+</head>
+<body>
+<h1>ProMinGit report</h1>
+<h2>All time</h2>
+<div id="project"></div>
+<div id="charts"></div>
+<h2>Periods</h2>
+<div id="windows"></div>
+<div id="window"></div>
+<h2>Authors</h2>
+<div id="authors"></div>
+<div id="author"></div>
+<script>
+var overview = __OVERVIEW__;
+var shards = {};
+
+// Shards are scripts calling loadShard, unlike fetch this also works for pages opened from disk.
+function loadShard(name, content) {
+  var shard = shards[name];
+  shard.content = content;
+  shard.callbacks.forEach(function (callback) { callback(content); });
+  shard.callbacks = [];
+}
+
+function getShard(name, callback) {
+  var shard = shards[name];
+  if (shard && shard.content) return callback(shard.content);
+  if (shard) return shard.callbacks.push(callback);
+  shards[name] = {content: null, callbacks: [callback]};
+  var script = document.createElement('script');
+  script.src = overview.shard_folder + '/' + name;
+  document.head.appendChild(script);
+}
+
+function format(value) {
+  return typeof value === 'number' && value % 1 !== 0 ? value.toFixed(2) : String(value);
+}
+
+function showTable(id, title, rows, columns, onClick) {
+  var container = document.getElementById(id);
+  container.innerHTML = '';
+  if (title) {
+    var heading = document.createElement('h3');
+    heading.textContent = title;
+    container.appendChild(heading);
+  }
+  var table = document.createElement('table');
+  var header = table.insertRow();
+  columns.forEach(function (column) {
+    var cell = document.createElement('th');
+    cell.textContent = column;
+    header.appendChild(cell);
+  });
+  rows.forEach(function (row) {
+    var tableRow = table.insertRow();
+    columns.forEach(function (column) { tableRow.insertCell().textContent = format(row[column]); });
+    if (onClick) {
+      tableRow.className = 'link';
+      tableRow.onclick = function () { onClick(row); };
+    }
+  });
+  container.appendChild(table);
+}
+
+showTable('project', null, [overview.project], overview.project_fields);
+overview.charts.forEach(function (chart) {
+  var image = document.createElement('img');
+  image.src = chart;
+  image.loading = 'lazy';
+  document.getElementById('charts').appendChild(image);
+});
+showTable('windows', null, overview.windows, ['time_from', 'time_to', 'num_authors', 'commit_number'],
+  function (period) {
+    getShard(period.shard, function (shard) {
+      showTable('window', 'Period ' + period.time_from + ' - ' + period.time_to, shard.authors,
+                overview.author_fields);
+    });
+  });
+showTable('authors', null, overview.authors, ['author', 'commit_number', 'periods'], function (author) {
+  getShard(author.shard, function (shard) {
+    showTable('author', 'Author ' + shard.author, [shard.all_time].concat(shard.windows),
+              ['time_from', 'time_to'].concat(overview.author_fields.slice(1)));
+  });
+});
+</script>
+</body>
+</html>
+'''
+
+
+def get_shard_name(kind, content):
+    data = json.dumps(content, sort_keys=True)
+    return '%s-%s.js' % (kind, hashlib.sha1(data.encode('utf-8')).hexdigest()[:16]), data
+
+
+class Report:
+    """Writes result.html with the all time project statistics inline and everything else in lazily loaded shards.
+
+    Every period and every author gets a shard named after the hash of its content, in a folder next to the page.
+    Shards that exist already are left alone, so a run only writes the periods and authors that changed, and
+    shards no longer referenced are removed.
+    """
+    def __init__(self, statistics, path=REPORT_PATH, image_folder=IMAGE_FOLDER):
+        self.statistics = statistics
+        self.path = path
+        self.shard_folder = os.path.splitext(path)[0] + '_shards'
+        self.image_folder = image_folder
+        self.shards = set()
+        self.written = []
+        self.write()
+
+    def write_shard(self, kind, content):
+        name, data = get_shard_name(kind, content)
+        self.shards.add(name)
+        path = os.path.join(self.shard_folder, name)
+        if not os.path.exists(path):
+            temporary_path = path + '.tmp'
+            with open(temporary_path, 'w') as file:
+                file.write('loadShard(%s, %s);\n' % (json.dumps(name), data))
+            os.replace(temporary_path, path)
+            self.written.append(name)
+        return name
+
+    def write(self):
+        os.makedirs(self.shard_folder, exist_ok=True)
+        statistics = self.statistics
+        windows = []
+        author_windows = {}
+        for author_statistics, project_statistics in zip(statistics.quartal_statistics,
+                                                         statistics.quartal_project_statistics):
+            authors, meta = author_statistics.serialize_author_data()
+            project, _ = project_statistics.serialize_project_data()
+            window = dict(meta)
+            window['shard'] = self.write_shard('window', {'meta': meta, 'project': project, 'authors': authors})
+            window['num_authors'] = project['num_authors']
+            window['commit_number'] = project['commit_number']
+            windows.append(window)
+            for author in authors:
+                row = dict(meta)
+                row.update(author)
+                author_windows.setdefault(author['author'], []).append(row)
+
+        authors = []
+        all_time_authors, _ = statistics.all_time_stats.serialize_author_data()
+        for author in all_time_authors:
+            all_time = {'time_from': 'all time', 'time_to': ''}
+            all_time.update(author)
+            rows = author_windows.get(author['author'], [])
+            shard = self.write_shard('author', {'author': author['author'], 'all_time': all_time, 'windows': rows})
+            authors.append({'author': author['author'], 'commit_number': author['commit_number'],
+                            'periods': len(rows), 'shard': shard})
+        authors.sort(key=lambda author: -author['commit_number'])
+
+        charts = []
+        for field in ProjectSerializer.fields:
+            chart = os.path.join(self.image_folder, '%s.png' % field)
+            if os.path.exists(chart):
+                charts.append(os.path.relpath(chart, os.path.dirname(os.path.abspath(self.path))))
+        overview = {
+            'project': statistics.all_time_project_stats.serialize_project_data()[0],
+            'project_fields': ProjectSerializer.fields,
+            'author_fields': AuthorSerializer.fields,
+            'windows': windows,
+            'authors': authors,
+            'charts': charts,
+            'shard_folder': os.path.basename(self.shard_folder),
+        }
+        with open(self.path, 'w') as file:
+            file.write(PAGE.replace('__OVERVIEW__', json.dumps(overview).replace('</', '<\\/')))
+        self.remove_stale_shards()
+
+    def remove_stale_shards(self):
+        for name in os.listdir(self.shard_folder):
+            if name.endswith('.js') and name not in self.shards:
+                os.remove(os.path.join(self.shard_folder, name))
@@ -1,7 +1,12 @@
+import csv
 import json
 
+from compression import open_text, strip_compression_extension
+from xml.sax.saxutils import quoteattr
+
 class GeneralSerializer:
-    content = []
+    def __init__(self):
+        self.content = []
 
     def insert(self, content, meta):
         self.content.append({'content': content, 'meta': meta})
@@ -10,6 +15,55 @@ class GeneralSerializer:
         return json.dumps(self.content)
 
 
+class StreamingSerializer:
+    """Writes every inserted record to the stream right away instead of collecting them.
+
+    ndjson writes one record per line, json writes the same array GeneralSerializer.serialize returns. for_path
+    compresses paths ending in .gz, .bz2, .xz or .zst.
+    """
+    formats = ['ndjson', 'json']
+
+    def __init__(self, stream, format='ndjson', close_stream=False):
+        if format not in self.formats:
+            raise ValueError('Unknown format %s' % format)
+        self.stream = stream
+        self.format = format
+        self.close_stream = close_stream
+        self.count = 0
+        if self.format == 'json':
+            self.stream.write('[')
+
+    @classmethod
+    def for_path(cls, path):
+        name = strip_compression_extension(path)
+        format = 'ndjson' if name.endswith(('.ndjson', '.jsonl')) else 'json'
+        return cls(open_text(path, 'w'), format, close_stream=True)
+
+    def insert(self, content, meta):
+        record = json.dumps({'content': content, 'meta': meta})
+        if self.format == 'json':
+            if self.count:
+                self.stream.write(', ')
+            self.stream.write(record)
+        else:
+            self.stream.write(record + '\n')
+        self.count += 1
+
+    def close(self):
+        if self.format == 'json':
+            self.stream.write(']')
+        if self.close_stream:
+            self.stream.close()
+        else:
+            self.stream.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
 class AuthorSerializer:
     fields = ['author', 'commit_number', 'all_new_lines', 'all_deleted_lines', 'commits_per_day',
               'files_per_commit', 'lines_per_commit', 'commits_under_25',
@@ -73,5 +127,73 @@ class ProjectSerializer:
 
 
 class EventSerializer:
-    def __init__(self):
-        pass
+    """Writes every inserted event to a csv or xes stream right away.
+
+    xes nests the events in one trace per case, so the events of a case have to be inserted one after another,
+    a case that comes back later starts another trace.
+    """
+    formats = ['csv', 'xes']
+    fields = ['case', 'activity', 'timestamp', 'author', 'commit', 'file', 'additions', 'deletions']
+    xes_header = ('<?xml version="1.0" encoding="UTF-8" ?>\n'
+                  '<log xes.version="1.0" xmlns="http://www.xes-standard.org/">\n'
+                  '<extension name="Concept" prefix="concept" uri="http://www.xes-standard.org/concept.xesext"/>\n'
+                  '<extension name="Time" prefix="time" uri="http://www.xes-standard.org/time.xesext"/>\n'
+                  '<extension name="Organizational" prefix="org" uri="http://www.xes-standard.org/org.xesext"/>\n'
+                  '<classifier name="Activity" keys="concept:name"/>\n')
+
+    def __init__(self, stream, format='csv', close_stream=False):
+        if format not in self.formats:
+            raise ValueError('Unknown format %s' % format)
+        self.stream = stream
+        self.format = format
+        self.close_stream = close_stream
+        self.count = 0
+        self.current_case = None
+        if self.format == 'csv':
+            self.writer = csv.writer(self.stream)
+            self.writer.writerow(self.fields)
+        else:
+            self.stream.write(self.xes_header)
+
+    @classmethod
+    def for_path(cls, path):
+        format = 'xes' if strip_compression_extension(path).endswith('.xes') else 'csv'
+        return cls(open_text(path, 'w', newline=''), format, close_stream=True)
+
+    def insert(self, event):
+        timestamp = event.time.astimezone().isoformat()
+        if self.format == 'csv':
+            self.writer.writerow([event.case, event.activity, timestamp, event.author, event.commit, event.file or '',
+                                  event.additions, event.deletions])
+        else:
+            if self.count == 0 or event.case != self.current_case:
+                if self.count:
+                    self.stream.write('</trace>\n')
+                self.stream.write('<trace><string key="concept:name" value=%s/>\n' % quoteattr(event.case))
+                self.current_case = event.case
+            self.stream.write('<event><string key="concept:name" value=%s/><date key="time:timestamp" value="%s"/>'
+                              '<string key="org:resource" value=%s/><string key="commit" value=%s/>'
+                              % (quoteattr(event.activity), timestamp, quoteattr(event.author),
+                                 quoteattr(event.commit)))
+            if event.file is not None:
+                self.stream.write('<string key="file" value=%s/><int key="additions" value="%d"/>'
+                                  '<int key="deletions" value="%d"/>'
+                                  % (quoteattr(event.file), event.additions, event.deletions))
+            self.stream.write('</event>\n')
+        self.count += 1
+
+    def close(self):
+        if self.format == 'xes':
+            if self.count:
+                self.stream.write('</trace>\n')
+            self.stream.write('</log>\n')
+        if self.close_stream:
+            self.stream.close()
+        else:
+            self.stream.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
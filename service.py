@@ -0,0 +1,237 @@
+import argparse
+import collections
+import datetime
+import json
+import socketserver
+import threading
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+from parser import Parser
+from statistics import Statistics
+from windowing import QUARTAL, parse_granularity, window_boundaries
+
+CACHE_SIZE = 256
+MAX_WINDOWS = 1000
+TIME_FORMATS = ['%Y-%m-%d', '%Y-%m-%dT%H:%M:%S', '%Y-%m-%d %H:%M:%S']
+
+
+class LRUCache:
+    def __init__(self, max_size=CACHE_SIZE):
+        self.max_size = max_size
+        self.items = collections.OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.items)
+
+    def peek(self, key):
+        with self.lock:
+            return self.items.get(key)
+
+    def get(self, key):
+        with self.lock:
+            value = self.items.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self.items.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        with self.lock:
+            self.items[key] = value
+            self.items.move_to_end(key)
+            while len(self.items) > self.max_size:
+                self.items.popitem(last=False)
+
+    def get_dict(self):
+        return {'size': len(self.items), 'max_size': self.max_size, 'hits': self.hits, 'misses': self.misses}
+
+
+def parse_time(value):
+    if value is None or value == '':
+        return None
+    try:
+        return datetime.datetime.fromtimestamp(float(value))
+    except ValueError:
+        pass
+    except (OverflowError, OSError):
+        raise ValueError('Time %s is out of range' % value)
+    for time_format in TIME_FORMATS:
+        try:
+            return datetime.datetime.strptime(value, time_format)
+        except ValueError:
+            pass
+    raise ValueError('Invalid time %s, expected epoch seconds or YYYY-MM-DD' % value)
+
+
+class QueryService:
+    """Answers author and project queries for any window of a data container that is loaded once.
+
+    The serialized results of every window stay in an LRU cache of cache_size windows. Missing windows are computed
+    under a lock, so concurrent requests for the same window compute it once, cached results are served in parallel.
+    A windows request may span at most max_windows periods.
+    """
+    def __init__(self, data_container, statistics_class=Statistics, cache_size=CACHE_SIZE, max_windows=MAX_WINDOWS):
+        self.statistics = statistics_class(data_container)
+        self.max_windows = max_windows
+        self.data_container = self.statistics.data_container
+        self.cache = LRUCache(cache_size)
+        self.compute_lock = threading.Lock()
+        self.start_time, self.end_time = self.statistics.get_project_interval()
+
+    def get_window_key(self, time_from=None, time_to=None):
+        if time_from is None and time_to is None:
+            return None, None
+        if time_from is None:
+            time_from = self.start_time
+        if time_to is None:
+            time_to = self.end_time + datetime.timedelta(seconds=1)
+        if time_from >= time_to:
+            raise ValueError('Window %s - %s is empty' % (time_from, time_to))
+        return time_from, time_to
+
+    def compute_window(self, time_from, time_to, window_commits=None):
+        author_statistics = self.statistics.author_statistics_class(self.data_container, time_from=time_from,
+                                                                    time_to=time_to, window_commits=window_commits)
+        project_statistics = self.statistics.project_statistics_class(self.data_container, author_statistics,
+                                                                      time_from=time_from, time_to=time_to)
+        authors, meta = author_statistics.serialize_author_data()
+        project, _ = project_statistics.serialize_project_data()
+        return {'authors': authors, 'project': project, 'meta': meta}
+
+    def get_window(self, time_from=None, time_to=None):
+        key = self.get_window_key(time_from, time_to)
+        result = self.cache.get(key)
+        if result is None:
+            with self.compute_lock:
+                result = self.cache.peek(key)
+                if result is None:
+                    result = self.compute_window(*key)
+                    self.cache.put(key, result)
+        return result
+
+    def get_windows(self, granularity=QUARTAL, time_from=None, time_to=None):
+        """Returns the project statistics of every period, the missing ones are bucketed in one pass."""
+        boundaries = window_boundaries(time_from or self.start_time, time_to or self.end_time, granularity,
+                                       self.max_windows)
+        keys = list(zip(boundaries, boundaries[1:]))
+        results = dict((key, self.cache.get(key)) for key in keys)
+        missing = [key for key, result in results.items() if result is None]
+        if missing:
+            with self.compute_lock:
+                buckets = self.statistics.bucket_commits(boundaries)
+                for key, window_commits in zip(keys, buckets):
+                    if results[key] is None:
+                        results[key] = self.cache.peek(key) or self.compute_window(key[0], key[1], window_commits)
+                        self.cache.put(key, results[key])
+        return [{'content': results[key]['project'], 'meta': results[key]['meta']} for key in keys]
+
+    def get_authors(self, time_from=None, time_to=None):
+        result = self.get_window(time_from, time_to)
+        return {'content': result['authors'], 'meta': result['meta']}
+
+    def get_author(self, author, time_from=None, time_to=None):
+        result = self.get_window(time_from, time_to)
+        for author_data in result['authors']:
+            if author_data['author'] == author:
+                return {'content': author_data, 'meta': result['meta']}
+        return None
+
+    def get_project(self, time_from=None, time_to=None):
+        result = self.get_window(time_from, time_to)
+        return {'content': result['project'], 'meta': result['meta']}
+
+
+class QueryHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        url = urllib.parse.urlparse(self.path)
+        query = dict((key, values[-1]) for key, values in urllib.parse.parse_qs(url.query).items())
+        parts = [urllib.parse.unquote(part) for part in url.path.split('/') if part]
+        service = self.server.service
+        try:
+            time_from, time_to = parse_time(query.get('from')), parse_time(query.get('to'))
+            if parts == ['authors']:
+                result = service.get_authors(time_from, time_to)
+            elif len(parts) == 2 and parts[0] == 'authors':
+                result = service.get_author(parts[1], time_from, time_to)
+            elif parts == ['project']:
+                result = service.get_project(time_from, time_to)
+            elif parts == ['windows']:
+                granularity = parse_granularity(query['granularity']) if 'granularity' in query else QUARTAL
+                result = service.get_windows(granularity, time_from, time_to)
+            elif parts == ['cache']:
+                result = service.cache.get_dict()
+            else:
+                result = None
+        except (ValueError, OverflowError) as error:
+            return self.send_json(400, {'error': str(error)})
+        if result is None:
+            return self.send_json(404, {'error': 'Not found'})
+        self.send_json(200, result)
+
+    def send_json(self, status, content):
+        body = json.dumps(content).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class QueryServer(socketserver.ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, service):
+        super().__init__(address, QueryHandler)
+        self.service = service
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='Serve ProMinGit statistics of one repository over HTTP/JSON.')
+    arg_parser.add_argument('log_path', nargs='?', default='logs/project_gitlog.log')
+    arg_parser.add_argument('--host', default='127.0.0.1')
+    arg_parser.add_argument('--port', type=int, default=8000)
+    arg_parser.add_argument('--cache-size', type=int, default=CACHE_SIZE,
+                            help='number of windows whose results are kept (default %d)' % CACHE_SIZE)
+    arg_parser.add_argument('--max-windows', type=int, default=MAX_WINDOWS,
+                            help='periods one windows request may span (default %d)' % MAX_WINDOWS)
+    arg_parser.add_argument('--columnar', action='store_true', help='compute statistics with the numpy backend')
+    arg_parser.add_argument('--repository', help='read the history straight from this git repository instead of a log')
+    arg_parser.add_argument('--load-snapshot', help='read the history from a binary snapshot instead of the log')
+    args = arg_parser.parse_args()
+
+    if args.load_snapshot:
+        from snapshot import load_snapshot
+        data_container = load_snapshot(args.load_snapshot)
+        args.columnar = True
+    elif args.repository:
+        from git_log import read_repository
+        data_container = read_repository(args.repository)
+    else:
+        data_container = Parser(args.log_path).create_data_container()
+    statistics_class = Statistics
+    if args.columnar:
+        from columnar import ColumnarStatistics
+        statistics_class = ColumnarStatistics
+
+    service = QueryService(data_container, statistics_class, args.cache_size, args.max_windows)
+    server = QueryServer((args.host, args.port), service)
+    print('Serving on http://%s:%d' % server.server_address[:2])
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+import numpy
+
+# A session ends when an author pauses for GAP_LIMIT seconds, and no session lasts longer than SPAN_LIMIT seconds.
+GAP_LIMIT = 8 * 60 * 60
+SPAN_LIMIT = 18 * 60 * 60
+
+
+class Sessions:
+    """Work sessions of all authors, detected in one vectorized pass over their commit times.
+
+    authors holds the author index of every commit and times its epoch seconds, in any order. Commits are sorted
+    by author and time, a new session starts at every author change and at every pause of gap_limit or more.
+    Sessions longer than span_limit are cut into span_limit long pieces counted from the session start.
+    """
+    def __init__(self, authors, times, number_of_authors=None, gap_limit=None, span_limit=None):
+        authors = numpy.asarray(authors, dtype=numpy.int64)
+        times = numpy.asarray(times, dtype=numpy.float64)
+        gap_limit = GAP_LIMIT if gap_limit is None else gap_limit
+        span_limit = SPAN_LIMIT if span_limit is None else span_limit
+        if number_of_authors is None:
+            number_of_authors = int(authors.max()) + 1 if len(authors) else 0
+
+        order = numpy.lexsort((times, authors))
+        authors = authors[order]
+        times = times[order]
+        starts = numpy.ones(len(times), dtype=bool)
+        starts[1:] = (authors[1:] != authors[:-1]) | (times[1:] - times[:-1] >= gap_limit)
+        gap_session_start = times[starts][numpy.cumsum(starts) - 1]
+        pieces = numpy.floor((times - gap_session_start) / span_limit).astype(numpy.int64)
+        starts[1:] |= pieces[1:] != pieces[:-1]
+
+        session = numpy.cumsum(starts) - 1
+        self.session_of_commit = numpy.empty(len(times), dtype=numpy.int64)
+        self.session_of_commit[order] = session
+        self.session_author = authors[starts]
+        self.session_start = times[starts]
+        self.session_end = numpy.maximum.reduceat(times, numpy.flatnonzero(starts)) if len(times) else times
+        self.session_commits = numpy.bincount(session, minlength=len(self.session_start))
+        self.sessions_per_author = numpy.bincount(self.session_author, minlength=number_of_authors)
+        self.commits_per_author = numpy.bincount(authors, minlength=number_of_authors)
+
+    @classmethod
+    def from_commit_lists(cls, commit_lists, **limits):
+        authors = [index for index, commits in enumerate(commit_lists) for _ in commits]
+        times = [commit.author_time.timestamp() for commits in commit_lists for commit in commits]
+        return cls(authors, times, len(commit_lists), **limits)
+
+    @property
+    def number_of_sessions(self):
+        return len(self.session_start)
+
+    @property
+    def session_lengths(self):
+        return self.session_end - self.session_start
+
+    def commits_per_day(self):
+        with numpy.errstate(divide='ignore', invalid='ignore'):
+            return self.commits_per_author / self.sessions_per_author
+
+    def summary(self, percentiles=(50, 90, 99)):
+        if not self.number_of_sessions:
+            return {'sessions': 0}
+        summary = {'sessions': self.number_of_sessions}
+        for name, values in [('session_length', self.session_lengths), ('commits_per_session', self.session_commits)]:
+            summary[name + '_mean'] = float(numpy.mean(values))
+            for percentile, value in zip(percentiles, numpy.percentile(values, percentiles)):
+                summary['%s_p%d' % (name, percentile)] = float(value)
+        return summary
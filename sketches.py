@@ -0,0 +1,262 @@
+import argparse
+import datetime
+import hashlib
+import json
+import math
+
+from events import iter_stream_commits
+from parser import StreamParser
+from windowing import next_window_start, parse_granularity, window_start
+
+HLL_PRECISION = 10
+RELATIVE_ACCURACY = 0.01
+MAX_BUCKETS = 2048
+PERCENTILES = (50, 90, 99)
+# Fixed day windows start at multiples of their length from here unless an origin is given, a stream can not know
+# its oldest commit up front.
+ORIGIN = datetime.datetime(1970, 1, 1)
+
+
+def get_hash(value):
+    return int.from_bytes(hashlib.blake2b(value.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+class HyperLogLog:
+    """Distinct count estimate in 2 ** precision one byte registers, about 1.04 / sqrt(2 ** precision) off.
+
+    Merging two sketches keeps the larger register, which gives the distinct count of the union.
+    """
+    def __init__(self, precision=HLL_PRECISION):
+        self.precision = precision
+        self.registers = bytearray(1 << precision)
+
+    def add(self, value):
+        value_hash = get_hash(value)
+        bits = 64 - self.precision
+        index = value_hash >> bits
+        rank = bits - (value_hash & ((1 << bits) - 1)).bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other):
+        if other.precision != self.precision:
+            raise ValueError('Can not merge sketches of precision %d and %d' % (self.precision, other.precision))
+        self.registers = bytearray(map(max, self.registers, other.registers))
+
+    def count(self):
+        size = len(self.registers)
+        estimate = 0.7213 / (1 + 1.079 / size) * size * size / sum(2.0 ** -register for register in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * size and zeros:
+            estimate = size * math.log(size / float(zeros))
+        return int(round(estimate))
+
+
+class QuantileSketch:
+    """DDSketch of non negative values, every quantile is within relative_accuracy of the true value.
+
+    Values fall into logarithmic buckets, merging adds the bucket counts. Beyond max_buckets the lowest buckets
+    are collapsed, which only costs accuracy in the lowest quantiles.
+    """
+    def __init__(self, relative_accuracy=RELATIVE_ACCURACY, max_buckets=MAX_BUCKETS):
+        self.relative_accuracy = relative_accuracy
+        self.max_buckets = max_buckets
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.log_gamma = math.log(self.gamma)
+        self.buckets = {}
+        self.zero_count = 0
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+
+    def add(self, value):
+        if value <= 0:
+            self.zero_count += 1
+        else:
+            key = int(math.ceil(math.log(value) / self.log_gamma))
+            self.buckets[key] = self.buckets.get(key, 0) + 1
+            if len(self.buckets) > self.max_buckets:
+                self.collapse()
+        self.count += 1
+        self.total += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def collapse(self):
+        keys = sorted(self.buckets)
+        for key in keys[:len(keys) - self.max_buckets]:
+            self.buckets[keys[len(keys) - self.max_buckets]] += self.buckets.pop(key)
+
+    def merge(self, other):
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError('Can not merge sketches of accuracy %s and %s'
+                             % (self.relative_accuracy, other.relative_accuracy))
+        for key, count in other.buckets.items():
+            self.buckets[key] = self.buckets.get(key, 0) + count
+        if len(self.buckets) > self.max_buckets:
+            self.collapse()
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.total += other.total
+        for value in (other.min, other.max):
+            if value is not None:
+                if self.min is None or value < self.min:
+                    self.min = value
+                if self.max is None or value > self.max:
+                    self.max = value
+
+    def quantile(self, quantile):
+        if not self.count:
+            return None
+        rank = quantile * (self.count - 1)
+        seen = self.zero_count
+        if rank < seen:
+            return 0
+        for key in sorted(self.buckets):
+            seen += self.buckets[key]
+            if seen > rank:
+                value = 2 * self.gamma ** key / (self.gamma + 1)
+                return min(max(value, self.min), self.max)
+        return self.max
+
+    @property
+    def mean(self):
+        return self.total / float(self.count) if self.count else 0
+
+
+class WindowSketch:
+    def __init__(self, precision=HLL_PRECISION, relative_accuracy=RELATIVE_ACCURACY):
+        self.commits = 0
+        self.authors = HyperLogLog(precision)
+        self.files = HyperLogLog(precision)
+        self.commit_size = QuantileSketch(relative_accuracy)
+        self.files_per_commit = QuantileSketch(relative_accuracy)
+
+    def add(self, author, commit):
+        self.commits += 1
+        self.authors.add(author.author_email)
+        for file_change in commit.file_changes:
+            self.files.add(file_change.file.path)
+        self.commit_size.add(commit.number_of_changes)
+        self.files_per_commit.add(len(commit.file_changes))
+
+    def merge(self, other):
+        self.commits += other.commits
+        self.authors.merge(other.authors)
+        self.files.merge(other.files)
+        self.commit_size.merge(other.commit_size)
+        self.files_per_commit.merge(other.files_per_commit)
+
+    def get_dict(self, percentiles=PERCENTILES):
+        result = {
+            'commit_number': self.commits,
+            'num_authors': self.authors.count(),
+            'num_files': self.files.count(),
+            'commit_size_mean': self.commit_size.mean,
+            'files_per_commit_mean': self.files_per_commit.mean,
+        }
+        for name, sketch in [('commit_size', self.commit_size), ('files_per_commit', self.files_per_commit)]:
+            for percentile in percentiles:
+                result['%s_p%g' % (name, percentile)] = sketch.quantile(percentile / 100.0)
+        return result
+
+
+class SketchIndex:
+    """Sketches of every window, updated one commit at a time and mergeable across chunks and repositories.
+
+    Memory depends on the number of windows only, not on the number of commits, authors or files. With the oldest
+    commit as origin, fixed day windows match the periods of Statistics.
+    """
+    def __init__(self, granularity='month', precision=HLL_PRECISION, relative_accuracy=RELATIVE_ACCURACY,
+                 origin=ORIGIN):
+        self.granularity = granularity
+        self.origin = origin
+        self.precision = precision
+        self.relative_accuracy = relative_accuracy
+        self.windows = {}
+
+    def get_window_start(self, time):
+        if isinstance(self.granularity, datetime.timedelta):
+            return self.origin + (time - self.origin) // self.granularity * self.granularity
+        return window_start(time, self.granularity)
+
+    def add(self, author, commit):
+        start = self.get_window_start(commit.commit_time)
+        sketch = self.windows.get(start)
+        if sketch is None:
+            sketch = self.windows[start] = WindowSketch(self.precision, self.relative_accuracy)
+        sketch.add(author, commit)
+
+    def add_commits(self, author_commits):
+        for author, commit in author_commits:
+            self.add(author, commit)
+        return self
+
+    def merge(self, other):
+        if other.granularity != self.granularity:
+            raise ValueError('Can not merge sketches of granularity %s and %s' % (self.granularity, other.granularity))
+        if isinstance(self.granularity, datetime.timedelta) and other.origin != self.origin:
+            raise ValueError('Can not merge sketches of origin %s and %s' % (self.origin, other.origin))
+        for start, other_sketch in other.windows.items():
+            sketch = self.windows.get(start)
+            if sketch is None:
+                sketch = self.windows[start] = WindowSketch(self.precision, self.relative_accuracy)
+            sketch.merge(other_sketch)
+
+    def get_sketch(self, time_from=None, time_to=None):
+        """Merges the windows starting inside [time_from, time_to) into one sketch."""
+        result = WindowSketch(self.precision, self.relative_accuracy)
+        for start, sketch in self.windows.items():
+            if (time_from is None or time_from <= start) and (time_to is None or start < time_to):
+                result.merge(sketch)
+        return result
+
+    def get_dicts(self, percentiles=PERCENTILES):
+        results = [{'content': self.get_sketch().get_dict(percentiles), 'meta': {'time_from': 'None',
+                                                                                  'time_to': 'None'}}]
+        for start in sorted(self.windows):
+            end = start + self.granularity if isinstance(self.granularity, datetime.timedelta) \
+                else next_window_start(start, self.granularity)
+            results.append({'content': self.windows[start].get_dict(percentiles),
+                            'meta': {'time_from': str(start), 'time_to': str(end)}})
+        return results
+
+    def write_json(self, path, percentiles=PERCENTILES):
+        with open(path, 'w') as file:
+            json.dump(self.get_dicts(percentiles), file)
+
+
+def sketch_log(log_path, granularity='month', precision=HLL_PRECISION, relative_accuracy=RELATIVE_ACCURACY):
+    """Builds the sketches of a log in one streaming pass, without keeping the commits in memory."""
+    return SketchIndex(granularity, precision, relative_accuracy).add_commits(
+        iter_stream_commits(StreamParser(log_path)))
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='Bounded memory distinct counts and size percentiles per '
+                                                     'period of one or more git logs.')
+    arg_parser.add_argument('log_paths', nargs='+', help='git log files, their sketches are merged')
+    arg_parser.add_argument('--granularity', type=parse_granularity, default='month',
+                            help='period length, one of day, week, month, quarter or a number of days (default month)')
+    arg_parser.add_argument('--precision', type=int, default=HLL_PRECISION,
+                            help='distinct count registers are 2 ** precision bytes (default %d)' % HLL_PRECISION)
+    arg_parser.add_argument('--accuracy', type=float, default=RELATIVE_ACCURACY,
+                            help='relative accuracy of the percentiles (default %g)' % RELATIVE_ACCURACY)
+    arg_parser.add_argument('--percentiles', type=float, nargs='+', default=list(PERCENTILES))
+    arg_parser.add_argument('--output', default='sketches.json')
+    args = arg_parser.parse_args()
+
+    index = SketchIndex(args.granularity, args.precision, args.accuracy)
+    for log_path in args.log_paths:
+        index.merge(sketch_log(log_path, args.granularity, args.precision, args.accuracy))
+    index.write_json(args.output, args.percentiles)
+    summary = index.get_sketch().get_dict(args.percentiles)
+    for name, value in summary.items():
+        print("{:<30}{}".format(name, value))
+
+
+if __name__ == '__main__':
+    main()
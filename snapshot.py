@@ -0,0 +1,102 @@
+import json
+import struct
+
+import numpy
+
+from columnar import ColumnarDataContainer
+
+MAGIC = b'PROMINGIT-SNAPSHOT-1'
+ALIGNMENT = 64
+STRING_COLUMNS = ['authors', 'files', 'commit_hash', 'commit_email', 'commit_branch', 'commit_comment']
+ARRAY_COLUMNS = ['file_is_test', 'commit_author', 'commit_author_time', 'commit_time', 'commit_additions',
+                 'commit_deletions', 'commit_new_lines', 'commit_test_new_lines', 'commit_files', 'commit_merge',
+                 'change_commit', 'change_file', 'change_additions', 'change_deletions']
+
+
+class InvalidSnapshot(Exception):
+    pass
+
+
+class StringTable:
+    """Read only list of strings stored as one utf-8 blob and the offsets of its items, decoded on access."""
+    def __init__(self, offsets, data):
+        self.offsets = offsets
+        self.data = data
+
+    @classmethod
+    def from_strings(cls, strings):
+        encoded = [string.encode('utf-8') for string in strings]
+        offsets = numpy.zeros(len(encoded) + 1, dtype=numpy.int64)
+        numpy.cumsum([len(item) for item in encoded], out=offsets[1:])
+        return cls(offsets, numpy.frombuffer(b''.join(encoded), dtype=numpy.uint8))
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        return self.data[self.offsets[index]:self.offsets[index + 1]].tobytes().decode('utf-8')
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+
+def align(offset):
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def save_snapshot(data_container, path):
+    if not isinstance(data_container, ColumnarDataContainer):
+        data_container = ColumnarDataContainer.from_data_container(data_container)
+
+    columns = []
+    for name in ARRAY_COLUMNS:
+        columns.append((name, numpy.ascontiguousarray(getattr(data_container, name))))
+    for name in STRING_COLUMNS:
+        table = StringTable.from_strings(getattr(data_container, name))
+        columns.append((name + '.offsets', table.offsets))
+        columns.append((name + '.data', table.data))
+
+    layout = []
+    offset = 0
+    for name, array in columns:
+        offset = align(offset)
+        layout.append({'name': name, 'dtype': array.dtype.str, 'shape': array.shape, 'offset': offset})
+        offset += array.nbytes
+    header = json.dumps(layout).encode('utf-8')
+    data_start = align(len(MAGIC) + 8 + len(header))
+
+    with open(path, 'wb') as file:
+        file.write(MAGIC)
+        file.write(struct.pack('<Q', len(header)))
+        file.write(header)
+        for entry, (name, array) in zip(layout, columns):
+            file.seek(data_start + entry['offset'])
+            array.tofile(file)
+
+
+def load_snapshot(path):
+    """Memory maps a snapshot, columns are only paged in once the statistics touch them."""
+    buffer = numpy.memmap(path, dtype=numpy.uint8, mode='r')
+    if buffer[:len(MAGIC)].tobytes() != MAGIC:
+        raise InvalidSnapshot(path)
+    header_length = struct.unpack('<Q', buffer[len(MAGIC):len(MAGIC) + 8].tobytes())[0]
+    header_start = len(MAGIC) + 8
+    layout = json.loads(buffer[header_start:header_start + header_length].tobytes().decode('utf-8'))
+    data_start = align(header_start + header_length)
+
+    columns = {}
+    for entry in layout:
+        dtype = numpy.dtype(entry['dtype'])
+        start = data_start + entry['offset']
+        size = int(numpy.prod(entry['shape'])) * dtype.itemsize
+        columns[entry['name']] = buffer[start:start + size].view(dtype).reshape(entry['shape'])
+
+    values = dict((name, columns[name]) for name in ARRAY_COLUMNS)
+    for name in STRING_COLUMNS:
+        values[name] = StringTable(columns[name + '.offsets'], columns[name + '.data'])
+    return ColumnarDataContainer(**values)
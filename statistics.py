@@ -1,7 +1,10 @@
-import datetime
+import multiprocessing
 
-from models import Project
-from serializer import AuthorSerializer, GeneralSerializer, ProjectSerializer
+import sessions
+from models import AuthorRecord, Project
+from serializer import AuthorSerializer, GeneralSerializer, ProjectSerializer, StreamingSerializer
+from sessions import Sessions
+from windowing import QUARTAL, bucket_commits, rolling_windows, window_boundaries
 
 
 class ProjectPeriodStatistics:
@@ -15,12 +18,9 @@ class ProjectPeriodStatistics:
         self.extract_statistics()
 
     def extract_statistics(self):
-        for key, author in self.statistics.authors.items():
-            author_commits = self.filter_author_commits(author)
-            if not author_commits:
-                continue
+        for author in self.statistics.author_records:
             self.project.num_authors += 1
-            self.project.commit_number += len(author_commits)
+            self.project.commit_number += author.commit_number
             self.project.all_new_lines += author.all_new_lines
             self.project.all_deleted_lines += author.all_deleted_lines
             self.project.commits_per_day += author.commits_per_day
@@ -30,21 +30,13 @@ class ProjectPeriodStatistics:
             self.project.test_line_number += author.test_line_number
             self.project.merge_commits += author.merge_commits
 
-        self.project.files_per_commit = self.project.files_per_commit / float(self.project.num_authors)
-        self.project.test_line_ratio = self.project.test_line_number / float(self.project.all_new_lines)
-        self.project.lines_per_commit = self.project.all_new_lines / float(self.project.commit_number)
+        if self.project.num_authors:
+            self.project.files_per_commit = self.project.files_per_commit / float(self.project.num_authors)
+            self.project.lines_per_commit = self.project.all_new_lines / float(self.project.commit_number)
+        if self.project.all_new_lines:
+            self.project.test_line_ratio = self.project.test_line_number / float(self.project.all_new_lines)
         self.project_serializer = ProjectSerializer(self.project)
 
-    def filter_author_commits(self, author):
-        if not self.time_from or not self.time_to:
-            return author.commits
-        author_commits = []
-        if self.time_from and self.time_to:
-            for commit in author.commits:
-                if commit.commit_time > self.time_from and commit.commit_time < self.time_to:
-                    author_commits.append(commit)
-        return author_commits
-
     def print_project(self):
         print("{:<7}{:<15}{:<15}{:<15}{:<15}{:<15}{:<15}{:<15}{:<15}{:<15}{:<15}".format(
                 'Author number', 'Commit number', 'New lines', 'Deleted lines', 'Commits/day', 'Files/commit', 'Lines/commit',
@@ -66,42 +58,57 @@ class ProjectPeriodStatistics:
 
 
 class AuthorPeriodStatistics:
-    def __init__(self, data_container, time_from=None, time_to=None):
+    def __init__(self, data_container, time_from=None, time_to=None, window_commits=None):
         self.authors = data_container.author_dict
         self.files = data_container.file_dict
-        self.commits_per_day = None
+        self.sessions = None
         self.obj_author_data = []
+        self.author_records = []
         self.time_from = time_from
         self.time_to = time_to
+        self.window_commits = window_commits
         self.extract_statistics()
 
     def extract_statistics(self):
         self.obj_author_data = []
+        self.author_records = []
+        window = []
         for key, author in self.authors.items():
             author_commits = self.filter_author_commits(author)
-            if not author_commits:
-                continue
-            setattr(author, 'author', author.author_email)
-            setattr(author, 'commit_number', len(author_commits))
-            setattr(author, 'all_new_lines', self.get_all_new_lines(author_commits))
-            setattr(author, 'all_deleted_lines', self.get_all_deleted_lines(author_commits))
-            setattr(author, 'commits_per_day', self.get_commits_per_day(author_commits))
-            setattr(author, 'files_per_commit', self.get_files_per_commit(author_commits))
-            setattr(author, 'lines_per_commit', self.get_added_lines_per_commit(author))
-            setattr(author, 'commits_under_25', self.get_commits_under(author_commits, 25))
-            setattr(author, 'commits_above_500', self.get_commits_under(author_commits, 500))
-            setattr(author, 'test_line_number', self.get_test_line_number(author_commits))
-            setattr(author, 'test_line_ratio', self.get_test_line_ratio(author))
-            setattr(author, 'merge_commits', self.get_all_merge_commits(author_commits))
-            self.obj_author_data.append(AuthorSerializer(author))
+            if author_commits:
+                window.append((author, author_commits))
+        self.sessions = Sessions.from_commit_lists([author_commits for author, author_commits in window])
+        commits_per_day = self.sessions.commits_per_day()
+
+        for index, (author, author_commits) in enumerate(window):
+            all_new_lines = self.get_all_new_lines(author_commits)
+            test_line_number = self.get_test_line_number(author_commits)
+            record = AuthorRecord(
+                author=author.author_email,
+                commit_number=len(author_commits),
+                all_new_lines=all_new_lines,
+                all_deleted_lines=self.get_all_deleted_lines(author_commits),
+                commits_per_day=float(commits_per_day[index]),
+                files_per_commit=self.get_files_per_commit(author_commits),
+                lines_per_commit=self.get_added_lines_per_commit(all_new_lines, author_commits),
+                commits_under_25=self.get_commits_under(author_commits, 25),
+                commits_above_500=self.get_commits_under(author_commits, 500),
+                test_line_number=test_line_number,
+                test_line_ratio=self.get_test_line_ratio(test_line_number, all_new_lines),
+                merge_commits=self.get_all_merge_commits(author_commits),
+            )
+            self.author_records.append(record)
+            self.obj_author_data.append(AuthorSerializer(record))
 
     def filter_author_commits(self, author):
+        if self.window_commits is not None:
+            return self.window_commits.get(author.author_email, [])
         if not self.time_from or not self.time_to:
             return author.commits
         author_commits = []
         if self.time_from and self.time_to:
             for commit in author.commits:
-                if commit.commit_time > self.time_from and commit.commit_time < self.time_to:
+                if commit.commit_time >= self.time_from and commit.commit_time < self.time_to:
                     author_commits.append(commit)
         return author_commits
 
@@ -111,22 +118,6 @@ class AuthorPeriodStatistics:
         #    self.extract_author_statistics(author)
         pass
 
-    def get_commits_per_day(self, commits):
-        day_averages = [0]
-        current_time = commits[0].author_time
-        DAY_THRESHOLD = 8
-        current_day_span = datetime.timedelta(hours=0)
-
-        for commit in commits:
-            if commit.author_time > current_time - datetime.timedelta(hours=DAY_THRESHOLD) and current_day_span < datetime.timedelta(hours=18):
-                day_averages[-1] += 1
-                current_day_span = current_time - commit.author_time
-            else:
-                day_averages.append(1)
-                current_day_span = datetime.timedelta(hours=0)
-            current_time = commit.author_time
-        return sum(day_averages)/len(day_averages)
-
     def get_files_per_commit(self, commits):
         sum_files = []
         for commit in commits:
@@ -156,13 +147,13 @@ class AuthorPeriodStatistics:
         test_lines = sum([commit.number_of_test_new_lines for commit in commits])
         return test_lines
 
-    def get_test_line_ratio(self, author):
-        if author.test_line_number == 0:
+    def get_test_line_ratio(self, test_line_number, all_new_lines):
+        if test_line_number == 0:
             return 0
-        return author.test_line_number/author.all_new_lines
+        return test_line_number/all_new_lines
 
-    def get_added_lines_per_commit(self, author):
-        return author.all_new_lines / len(author.commits)
+    def get_added_lines_per_commit(self, all_new_lines, commits):
+        return all_new_lines / len(commits)
 
 
     def print_authors(self):
@@ -170,11 +161,18 @@ class AuthorPeriodStatistics:
                 'Author', 'Commit number', 'New lines', 'Deleted lines', 'Commits/day', 'Files/commit', 'Lines/commit',
                 'Commits < 25', 'Commits > 500',  'Test ratio', 'Merge Commits'
         ))
-        for serialized_author in self.obj_author_data:
+        for serialized_author in self.get_serialized_authors():
             serialized_author.print_author()
 
+    def get_serialized_authors(self):
+        # Released after streaming, the records are enough to serialize them again.
+        return self.obj_author_data or [AuthorSerializer(author) for author in self.author_records]
+
+    def release_serialized_authors(self):
+        self.obj_author_data = []
+
     def serialize_author_data(self):
-        return [author_obj.get_dict() for author_obj in self.obj_author_data], \
+        return [author_obj.get_dict() for author_obj in self.get_serialized_authors()], \
                {'time_from': str(self.time_from), 'time_to': str(self.time_to)}
 
     def print_statistics(self):
@@ -186,10 +184,55 @@ class AuthorPeriodStatistics:
         print(" ")
 
 
+class RecordedAuthorPeriodStatistics(AuthorPeriodStatistics):
+    """Period statistics of already computed author records and sessions, e.g. from a worker process or a state."""
+    def __init__(self, author_records, time_from=None, time_to=None, sessions=None):
+        self.time_from = time_from
+        self.time_to = time_to
+        self.author_records = author_records
+        self.sessions = sessions
+        self.obj_author_data = []
+        self.extract_statistics()
+
+    def extract_statistics(self):
+        self.obj_author_data = [AuthorSerializer(author) for author in self.author_records]
+
+
+# Set in every window worker process by init_window_worker, forked workers share the parent's memory.
+window_worker = None
+
+
+def init_window_worker(author_statistics_class, data_container, windows, session_limits):
+    global window_worker
+    window_worker = (author_statistics_class, data_container, windows)
+    sessions.GAP_LIMIT, sessions.SPAN_LIMIT = session_limits
+
+
+def evaluate_window(index):
+    author_statistics_class, data_container, windows = window_worker
+    time_from, time_to, window_commits = windows[index]
+    statistics = author_statistics_class(data_container, time_from=time_from, time_to=time_to,
+                                         window_commits=window_commits)
+    return statistics.author_records, statistics.sessions
+
+
 class Statistics:
-    def __init__(self, data_container):
-        self.general_serializer = GeneralSerializer()
+    """Author and project statistics of the whole history and of every period.
+
+    Author statistics are memoized by their (time_from, time_to) window. With processes, the periods are evaluated
+    in a process pool that gets the data container once per worker, only the author records and sessions travel back.
+    Every period is written as soon as it is computed, with a StreamingSerializer only its records are kept after.
+    """
+    author_statistics_class = AuthorPeriodStatistics
+    project_statistics_class = ProjectPeriodStatistics
+
+    def __init__(self, data_container, granularity=QUARTAL, serializer=None, processes=None):
+        self.general_serializer = serializer if serializer is not None else GeneralSerializer()
+        self.streaming = isinstance(self.general_serializer, StreamingSerializer)
         self.data_container = data_container
+        self.granularity = granularity
+        self.processes = processes
+        self.window_statistics = {}
         self.quartal_statistics = []
         self.quartal_project_statistics = []
         self.all_time_stats = None
@@ -199,27 +242,67 @@ class Statistics:
         self.all_time_project_stats = self.generate_all_time_project_stats()
         self.generate_quartal_statistics()
 
-    def generate_all_time_stats(self):
-        statistics = AuthorPeriodStatistics(self.data_container)
+    def get_window_statistics(self, time_from=None, time_to=None, window_commits=None):
+        statistics = self.window_statistics.get((time_from, time_to))
+        if statistics is None:
+            statistics = self.author_statistics_class(self.data_container, time_from=time_from, time_to=time_to,
+                                                      window_commits=window_commits)
+            self.window_statistics[(time_from, time_to)] = statistics
+        return statistics
+
+    def evaluate_windows(self, windows):
+        """Yields the author statistics of the (time_from, time_to, window_commits) windows in order.
+
+        Windows not memoized yet are computed, each one is yielded as soon as it is ready so it is written right away.
+        """
+        missing = [index for index, (time_from, time_to, _) in enumerate(windows)
+                   if (time_from, time_to) not in self.window_statistics]
+        if self.processes and self.processes > 1 and len(missing) > 1:
+            initargs = (self.author_statistics_class, self.data_container, windows,
+                        (sessions.GAP_LIMIT, sessions.SPAN_LIMIT))
+            with multiprocessing.Pool(min(self.processes, len(missing)), init_window_worker, initargs) as pool:
+                results = pool.imap(evaluate_window, missing)
+                missing = set(missing)
+                for index, (time_from, time_to, window_commits) in enumerate(windows):
+                    if index in missing:
+                        author_records, window_sessions = next(results)
+                        self.window_statistics[(time_from, time_to)] = RecordedAuthorPeriodStatistics(
+                            author_records, time_from, time_to, window_sessions)
+                    yield self.get_window_statistics(time_from, time_to, window_commits)
+            return
+        for window in windows:
+            yield self.get_window_statistics(*window)
+
+    def insert_author_statistics(self, statistics):
         self.general_serializer.insert(*statistics.serialize_author_data())
+        if self.streaming:
+            # Written already, only the records stay for the report and printing.
+            statistics.release_serialized_authors()
+
+    def insert_period(self, stats, project_stats):
+        self.quartal_statistics.append(stats)
+        self.quartal_project_statistics.append(project_stats)
+        self.insert_author_statistics(stats)
+        self.general_serializer.insert(*project_stats.serialize_project_data())
+
+    def generate_all_time_stats(self):
+        statistics = self.get_window_statistics()
+        self.insert_author_statistics(statistics)
         return statistics
 
     def generate_all_time_project_stats(self):
-        statistics = ProjectPeriodStatistics(self.data_container, self.all_time_stats)
+        statistics = self.project_statistics_class(self.data_container, self.all_time_stats)
         self.general_serializer.insert(*statistics.serialize_project_data())
         return statistics
 
     def generate_quartal_statistics(self):
         start_date, end_date = self.get_project_interval()
-        quartal = datetime.timedelta(days=90)
-        while start_date < end_date:
-            stats = AuthorPeriodStatistics(self.data_container, time_from=start_date, time_to=start_date + quartal)
-            project_stats = ProjectPeriodStatistics(self.data_container, stats, time_from=start_date, time_to=start_date + quartal)
-            start_date += quartal
-            self.quartal_statistics.append(stats)
-            self.quartal_project_statistics.append(project_stats)
-            self.general_serializer.insert(*stats.serialize_author_data())
-            self.general_serializer.insert(*project_stats.serialize_project_data())
+        boundaries = window_boundaries(start_date, end_date, self.granularity)
+        buckets = self.bucket_commits(boundaries)
+        windows = list(zip(boundaries, boundaries[1:], buckets))
+        for (time_from, time_to, _), stats in zip(windows, self.evaluate_windows(windows)):
+            project_stats = self.project_statistics_class(self.data_container, stats, time_from=time_from, time_to=time_to)
+            self.insert_period(stats, project_stats)
 
     def print_statistics(self, all=False):
         if all:
@@ -231,5 +314,17 @@ class Statistics:
         for statistics in self.quartal_project_statistics:
             statistics.print_statistics()
 
+    def bucket_commits(self, boundaries):
+        return bucket_commits(self.data_container.author_list, boundaries)
+
+    def rolling_statistics(self, width, step):
+        return [(time_from, time_to, aggregate.get_dict())
+                for time_from, time_to, aggregate in rolling_windows(self.data_container.author_list, width, step)]
+
+    def session_summaries(self):
+        """Returns (time_from, time_to, summary) of the work sessions of the whole history and of every period."""
+        return [(statistics.time_from, statistics.time_to, statistics.sessions.summary())
+                for statistics in [self.all_time_stats] + self.quartal_statistics]
+
     def get_project_interval(self):
         return self.data_container.commit_list[-1].commit_time, self.data_container.commit_list[0].commit_time
\ No newline at end of file
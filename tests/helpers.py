@@ -0,0 +1,77 @@
+import datetime
+import random
+
+DIRECTORIES = ['app/models', 'app/views', 'lib', 'spec']
+AUTHORS = ['ann.dev@example.com', 'bob.ops@example.com', 'cyd.qa@example.com']
+
+
+def get_rename(old_path, new_path):
+    old_directory, old_name = old_path.rsplit('/', 1)
+    new_directory, new_name = new_path.rsplit('/', 1)
+    if old_directory == new_directory:
+        return '%s/{%s => %s}' % (old_directory, old_name, new_name)
+    return '%s => %s' % (old_path, new_path)
+
+
+def generate_commits(number_of_commits=600, seed=7):
+    """Returns commits oldest first, files move between directories, in and out of tests and to dropped types."""
+    generator = random.Random(seed)
+    paths = ['%s/f%d.py' % (generator.choice(DIRECTORIES), index) for index in range(30)]
+    time = datetime.datetime(2017, 1, 1)
+    commits = []
+    for index in range(number_of_commits):
+        time += datetime.timedelta(hours=generator.randint(1, 12))
+        author = generator.choice(AUTHORS)
+        if generator.random() < 0.05:
+            commits.append(('%07x' % index, author, time, "Merge branch 'feature'", []))
+            continue
+        changes = []
+        for path in generator.sample(paths, 3):
+            if generator.random() < 0.15:
+                name = path.rsplit('/', 1)[1]
+                base = name[5:] if name.startswith('test_') else 'test_' + name
+                if generator.random() < 0.5:
+                    new_path = '%s/%s' % (path.rsplit('/', 1)[0], base)
+                else:
+                    new_path = '%s/%s' % (generator.choice(DIRECTORIES), name)
+                if generator.random() < 0.05:
+                    new_path = new_path[:-3] + '.txt'
+                if new_path in paths:
+                    continue
+                paths[paths.index(path)] = new_path
+                if new_path.endswith('.txt'):
+                    paths.append('lib/f%d.py' % (100 + index))
+                path = get_rename(path, new_path)
+            changes.append((generator.randint(0, 60), generator.randint(0, 20), path))
+        commits.append(('%07x' % index, author, time, 'change', changes))
+    return commits
+
+
+def write_log(path, commits):
+    with open(path, 'w') as file:
+        for short_hash, author, time, comment, changes in reversed(commits):
+            timestamp = int(time.timestamp())
+            file.write('start\n%s;%s;%d;%s;%d;;\nstartcomment\n%s;\nend\n'
+                       % (short_hash, author, timestamp, author, timestamp, comment))
+            for additions, deletions, file_path in changes:
+                file.write('%d\t%d\t%s\n' % (additions, deletions, file_path))
+            file.write('\n')
+
+
+def round_values(content):
+    # Sums over authors depend on their order, which differs between the backends.
+    return dict((name, round(value, 9) if isinstance(value, float) else value) for name, value in content.items())
+
+
+def get_results(statistics):
+    if statistics.all_time_stats is None:
+        statistics.generate_statistics()
+    results = []
+    for record in statistics.general_serializer.content:
+        content = record['content']
+        if isinstance(content, list):
+            content = [round_values(author) for author in sorted(content, key=lambda author: author['author'])]
+        else:
+            content = round_values(content)
+        results.append({'content': content, 'meta': record['meta']})
+    return results
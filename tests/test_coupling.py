@@ -0,0 +1,39 @@
+import collections
+import itertools
+import random
+
+from coupling import ChangeCoupling
+
+
+class Change:
+    def __init__(self, path):
+        self.file = collections.namedtuple('File', 'path')(path)
+
+
+class Commit:
+    is_merge_commit = False
+
+    def __init__(self, paths):
+        self.file_changes = [Change(path) for path in paths]
+
+
+def test_pruned_supports_bound_the_true_support():
+    generator = random.Random(3)
+    paths = ['f%d.py' % index for index in range(60)]
+    # A few files change together often, the rest at random.
+    commits = [Commit(generator.sample(paths[:4], 3) if generator.random() < 0.3 else generator.sample(paths, 4))
+               for _ in range(3000)]
+    true_support = collections.Counter()
+    for commit in commits:
+        for pair in itertools.combinations(sorted(change.file.path for change in commit.file_changes), 2):
+            true_support[pair] += 1
+
+    coupling = ChangeCoupling(max_pairs=200).add_commits(commits)
+    assert coupling.bucket > 0
+    assert len(coupling.pairs) <= 200
+    for (first, second), support in true_support.items():
+        lowest, highest = coupling.get_support_bounds(first, second)
+        assert lowest <= support <= highest
+        assert highest - lowest <= coupling.bucket
+    for first, second in itertools.combinations(paths[:4], 2):
+        assert coupling.get_support_bounds(first, second)[0] > 0
@@ -0,0 +1,15 @@
+import datetime
+import random
+
+from events import Event, group_by_case
+
+
+def test_group_by_case_spills_and_orders_every_case_oldest_first():
+    generator = random.Random(5)
+    time = datetime.datetime(2019, 1, 1)
+    # Log order, newest first.
+    events = [Event(generator.choice(['ann', 'bob', 'cyd', 'dan']), 'lib', time - datetime.timedelta(hours=index),
+                    'ann', '%07x' % index) for index in range(500)]
+    grouped = list(group_by_case(events, batch_size=32))
+    expected = sorted(events, key=lambda event: (event.case, event.time))
+    assert [(event.case, event.commit) for event in grouped] == [(event.case, event.commit) for event in expected]
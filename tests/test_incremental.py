@@ -0,0 +1,52 @@
+import datetime
+
+from helpers import get_results, write_log
+from incremental import analyse_incrementally
+from parser import Parser
+from statistics import Statistics
+
+START = datetime.datetime(2018, 1, 1)
+
+
+def get_commit(index, author, days, changes, comment='change'):
+    return '%07x' % index, author, START + datetime.timedelta(days=days), comment, changes
+
+
+def test_merged_commits_older_than_the_last_analysed_commit(tmp_path):
+    main_commits = [
+        get_commit(1, 'ann.dev@example.com', 1, [(10, 2, 'app/a.py')]),
+        get_commit(2, 'bob.ops@example.com', 40, [(5, 1, 'app/b.py')]),
+        get_commit(3, 'ann.dev@example.com', 100, [(7, 0, 'app/test_a.py')]),
+    ]
+    # A branch with commits from before the last analysed commit is merged afterwards.
+    merged_commits = main_commits[:1] + [
+        get_commit(4, 'cyd.qa@example.com', 20, [(30, 4, 'lib/c.py')]),
+        main_commits[1],
+        get_commit(5, 'ann.dev@example.com', 60, [(12, 3, 'lib/test_c.py')]),
+        main_commits[2],
+        get_commit(6, 'bob.ops@example.com', 120, [], "Merge branch 'feature'"),
+    ]
+    state_path = str(tmp_path / 'state.pickle')
+    log_path = str(tmp_path / 'project.log')
+    write_log(log_path, main_commits)
+    analyse_incrementally(log_path, state_path, 'month')
+    write_log(log_path, merged_commits)
+    statistics = analyse_incrementally(log_path, state_path, 'month')
+
+    expected_container = Parser(log_path).create_data_container()
+    assert [commit.short_hash for commit in statistics.data_container.commit_list] == \
+        [commit.short_hash for commit in expected_container.commit_list]
+    assert get_results(statistics) == get_results(Statistics(expected_container, 'month'))
+
+
+def test_rewritten_history_starts_over(tmp_path):
+    state_path = str(tmp_path / 'state.pickle')
+    log_path = str(tmp_path / 'project.log')
+    write_log(log_path, [get_commit(1, 'ann.dev@example.com', 1, [(10, 2, 'app/a.py')]),
+                         get_commit(2, 'bob.ops@example.com', 5, [(5, 1, 'app/b.py')])])
+    analyse_incrementally(log_path, state_path, 'month')
+    commits = [get_commit(1, 'ann.dev@example.com', 1, [(10, 2, 'app/a.py')]),
+               get_commit(3, 'bob.ops@example.com', 6, [(8, 1, 'app/b.py')])]
+    write_log(log_path, commits)
+    statistics = analyse_incrementally(log_path, state_path, 'month')
+    assert get_results(statistics) == get_results(Statistics(Parser(log_path).create_data_container(), 'month'))
@@ -0,0 +1,74 @@
+import pytest
+
+from columnar import ColumnarDataContainer, ColumnarStatistics
+from helpers import generate_commits, get_results, write_log
+from incremental import analyse_incrementally
+from parser import ParallelParser, Parser
+from statistics import Statistics
+
+
+def get_files(data_container):
+    return sorted(file.path for file in data_container.file_list)
+
+
+def get_index_results(data_container):
+    return data_container.directory_tree.rollup(), \
+        [file_churn.get_dict() for _, file_churn in data_container.churn_index.top(100)]
+
+
+@pytest.fixture(scope='module')
+def commits():
+    return generate_commits()
+
+
+@pytest.fixture(scope='module')
+def log_path(tmp_path_factory, commits):
+    path = str(tmp_path_factory.mktemp('logs') / 'renames.log')
+    write_log(path, commits)
+    return path
+
+
+@pytest.fixture(scope='module')
+def serial(log_path):
+    data_container = Parser(log_path, hotspots=True, directories=True).create_data_container()
+    return data_container, get_results(Statistics(data_container, 'month'))
+
+
+def test_renames_are_resolved(serial):
+    data_container, _ = serial
+    assert data_container.renamed_paths
+    assert not any(' => ' in path for path in get_files(data_container))
+    assert not any(path in data_container.renamed_paths for path in get_files(data_container))
+
+
+@pytest.mark.parametrize('processes', [2, 3, 5])
+def test_parallel_parser_matches_serial(log_path, serial, processes):
+    expected_container, expected = serial
+    data_container = ParallelParser(log_path, processes, hotspots=True, directories=True).create_data_container()
+    assert get_files(data_container) == get_files(expected_container)
+    assert data_container.dropped_file_changes == expected_container.dropped_file_changes
+    assert get_results(Statistics(data_container, 'month')) == expected
+    assert get_index_results(data_container) == get_index_results(expected_container)
+
+
+@pytest.mark.parametrize('processes', [2, 3, 5])
+def test_columnar_chunks_match_serial(log_path, serial, processes):
+    expected_container, _ = serial
+    expected = get_results(ColumnarStatistics(expected_container, 'month'))
+    data_container = ColumnarDataContainer.from_log(log_path, processes)
+    assert sorted(data_container.files) == get_files(expected_container)
+    assert get_results(ColumnarStatistics(data_container, 'month')) == expected
+
+
+@pytest.mark.parametrize('runs', [[300], [150, 420], [100, 200, 300, 400, 500]])
+def test_incremental_runs_match_serial(tmp_path, commits, log_path, serial, runs):
+    expected_container, expected = serial
+    state_path = str(tmp_path / 'state.pickle')
+    for index, number_of_commits in enumerate(runs):
+        partial_log_path = str(tmp_path / 'partial.log')
+        write_log(partial_log_path, commits[:number_of_commits])
+        analyse_incrementally(partial_log_path, state_path, 'month', hotspots=index % 2 == 0)
+    statistics = analyse_incrementally(log_path, state_path, 'month', hotspots=True, directories=True)
+    assert get_files(statistics.data_container) == get_files(expected_container)
+    assert get_results(statistics) == expected
+    assert get_index_results(statistics.data_container) == get_index_results(expected_container)
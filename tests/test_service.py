@@ -0,0 +1,101 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+from columnar import ColumnarStatistics
+from helpers import generate_commits, write_log
+from parser import Parser
+from service import LRUCache, QueryServer, QueryService
+from statistics import Statistics
+
+
+@pytest.fixture(scope='module')
+def data_container(tmp_path_factory):
+    log_path = str(tmp_path_factory.mktemp('logs') / 'service.log')
+    write_log(log_path, generate_commits())
+    return Parser(log_path).create_data_container()
+
+
+@pytest.fixture
+def server(data_container):
+    server = QueryServer(('127.0.0.1', 0), QueryService(data_container, max_windows=20))
+    thread = threading.Thread(target=server.serve_forever)
+    thread.start()
+    yield 'http://127.0.0.1:%d' % server.server_address[1]
+    server.shutdown()
+    server.server_close()
+    thread.join()
+
+
+def get_json(url):
+    try:
+        with urllib.request.urlopen(url) as response:
+            return response.status, json.loads(response.read().decode('utf-8'))
+    except urllib.error.HTTPError as error:
+        return error.code, json.loads(error.read().decode('utf-8'))
+
+
+def test_cache_evicts_the_least_recently_used_window():
+    cache = LRUCache(max_size=2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1
+    cache.put('c', 3)
+    assert len(cache) == 2
+    assert cache.get('b') is None
+    assert (cache.get('a'), cache.get('c')) == (1, 3)
+    assert cache.get_dict() == {'size': 2, 'max_size': 2, 'hits': 3, 'misses': 1}
+
+
+def test_repeated_queries_hit_the_cache(data_container):
+    service = QueryService(data_container)
+    first = service.get_project()
+    assert service.get_project() == first
+    assert service.get_authors()['meta'] == first['meta']
+    assert (service.cache.hits, service.cache.misses) == (2, 1)
+    service.get_windows('month')
+    misses = service.cache.misses
+    service.get_windows('month')
+    assert service.cache.misses == misses
+    assert len(service.cache) == misses
+
+
+@pytest.mark.parametrize('statistics_class', [Statistics, ColumnarStatistics])
+@pytest.mark.parametrize('granularity', ['week', 'month', 'quarter'])
+def test_windows_match_the_period_statistics(data_container, statistics_class, granularity):
+    statistics = statistics_class(data_container, granularity)
+    statistics.generate_statistics()
+    expected = [dict(zip(['content', 'meta'], project_statistics.serialize_project_data()))
+                for project_statistics in statistics.quartal_project_statistics]
+    service = QueryService(data_container, statistics_class)
+    assert service.get_windows(granularity) == expected
+    # A second request over part of the range is served from the cache.
+    assert service.get_windows(granularity, statistics.quartal_statistics[1].time_from) == expected[1:]
+
+
+def test_handler_answers_queries(server, data_container):
+    status, project = get_json(server + '/project')
+    assert status == 200
+    assert project['content']['commit_number'] == len(data_container.commit_list)
+    author = data_container.author_list[0].author_email
+    assert get_json(server + '/authors/' + author)[1]['content']['author'] == author
+    assert get_json(server + '/authors/nobody')[0] == 404
+    assert get_json(server + '/windows?granularity=month')[0] == 200
+    assert get_json(server + '/cache')[1]['misses'] > 0
+
+
+@pytest.mark.parametrize('query', [
+    '/project?from=2017-03-01&to=2017-02-01',
+    '/authors?from=2017-02-01&to=2017-02-01',
+    '/windows?granularity=day',
+    '/windows?granularity=0',
+    '/project?from=yesterday',
+    '/project?from=1e20',
+])
+def test_handler_rejects_bad_queries(server, query):
+    status, content = get_json(server + query)
+    assert status == 400
+    assert content['error']
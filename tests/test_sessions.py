@@ -0,0 +1,33 @@
+from columnar import ColumnarStatistics
+from helpers import generate_commits, write_log
+from incremental import analyse_incrementally
+from parser import Parser
+from statistics import Statistics
+
+
+def get_summaries(statistics):
+    if statistics.all_time_stats is None:
+        statistics.generate_statistics()
+    return statistics.session_summaries()
+
+
+def test_session_summaries_survive_processes_and_stored_state(tmp_path):
+    commits = generate_commits()
+    log_path = str(tmp_path / 'project.log')
+    write_log(log_path, commits)
+    data_container = Parser(log_path).create_data_container()
+    expected = get_summaries(Statistics(data_container, 'month'))
+    assert expected[0][2]['sessions'] > len(expected) - 1
+
+    assert get_summaries(Statistics(data_container, 'month', processes=2)) == expected
+    assert get_summaries(ColumnarStatistics(data_container, 'month', processes=2)) == expected
+
+    state_path = str(tmp_path / 'state.pickle')
+    write_log(log_path, commits[:400])
+    analyse_incrementally(log_path, state_path, 'month')
+    write_log(log_path, commits)
+    assert analyse_incrementally(log_path, state_path, 'month').session_summaries() == expected
+    # Nothing new, every period comes from the state.
+    statistics = analyse_incrementally(log_path, state_path, 'month')
+    assert statistics.reused_windows == len(expected) - 1
+    assert statistics.session_summaries() == expected
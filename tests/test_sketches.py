@@ -0,0 +1,98 @@
+import math
+import random
+
+import numpy
+import pytest
+
+import sketches
+from sketches import HLL_PRECISION, RELATIVE_ACCURACY, HyperLogLog, QuantileSketch
+
+
+def get_values(number_of_values, seed):
+    generator = random.Random(seed)
+    return [int(generator.lognormvariate(4, 2)) for _ in range(number_of_values)]
+
+
+def sketch_values(values, **options):
+    sketch = QuantileSketch(**options)
+    for value in values:
+        sketch.add(value)
+    return sketch
+
+
+def count_distinct(values):
+    sketch = HyperLogLog()
+    for value in values:
+        sketch.add(value)
+    return sketch
+
+
+def get_state(sketch):
+    return sketch.buckets, sketch.zero_count, sketch.count, sketch.total, sketch.min, sketch.max
+
+
+def test_rank_counts_the_leading_zeros_after_the_register_bits(monkeypatch):
+    monkeypatch.setattr(sketches, 'get_hash', lambda value: value)
+    bits = 64 - HLL_PRECISION
+    sketch = HyperLogLog()
+    sketch.add((5 << bits) | (1 << (bits - 1)))
+    sketch.add((6 << bits) | (1 << (bits - 3)))
+    sketch.add((6 << bits) | 1)
+    sketch.add(7 << bits)
+    assert (sketch.registers[5], sketch.registers[6], sketch.registers[7]) == (1, bits, bits + 1)
+    assert sketch.registers.count(0) == len(sketch.registers) - 3
+
+
+@pytest.mark.parametrize('number_of_values', [0, 10, 500, 5000, 50000])
+def test_distinct_counts(number_of_values):
+    values = ['author%d@example.com' % index for index in range(number_of_values)]
+    # Duplicates must not count, small counts go through the linear counting correction.
+    estimate = count_distinct(values + values[:number_of_values // 2]).count()
+    assert abs(estimate - number_of_values) <= 3 / math.sqrt(2 ** HLL_PRECISION) * number_of_values
+
+
+def test_distinct_count_merge_is_the_union():
+    first = ['a%d' % index for index in range(3000)]
+    second = ['a%d' % index for index in range(2000, 6000)]
+    merged = count_distinct(first)
+    merged.merge(count_distinct(second))
+    other_way = count_distinct(second)
+    other_way.merge(count_distinct(first))
+    expected = count_distinct(first + second)
+    assert merged.registers == other_way.registers == expected.registers
+    with pytest.raises(ValueError):
+        merged.merge(HyperLogLog(HLL_PRECISION + 1))
+
+
+@pytest.mark.parametrize('seed', [1, 2, 3])
+def test_quantiles_within_relative_accuracy(seed):
+    values = get_values(20000, seed)
+    sketch = sketch_values(values)
+    for percentile in (0, 50, 90, 99, 100):
+        expected = numpy.percentile(values, percentile, method='lower')
+        assert abs(sketch.quantile(percentile / 100.0) - expected) <= RELATIVE_ACCURACY * expected
+    assert QuantileSketch().quantile(0.5) is None
+
+
+def test_collapse_keeps_the_high_quantiles():
+    values = [1.01 ** exponent for exponent in range(1, 2001)]
+    sketch = sketch_values(values, max_buckets=100)
+    assert len(sketch.buckets) == 100
+    assert sketch.count == len(values)
+    for percentile in (95, 99):
+        expected = numpy.percentile(values, percentile, method='lower')
+        assert abs(sketch.quantile(percentile / 100.0) - expected) <= RELATIVE_ACCURACY * expected
+    # The collapsed low values all fall into the lowest kept bucket.
+    assert sketch.quantile(0.01) > numpy.percentile(values, 1, method='lower')
+
+
+def test_quantile_merge_equals_sketching_both():
+    first, second = get_values(5000, 4), get_values(3000, 5) + [0, 0]
+    merged = sketch_values(first)
+    merged.merge(sketch_values(second))
+    other_way = sketch_values(second)
+    other_way.merge(sketch_values(first))
+    expected = sketch_values(first + second)
+    assert get_state(merged) == get_state(other_way) == get_state(expected)
+    with pytest.raises(ValueError):
+        merged.merge(QuantileSketch(RELATIVE_ACCURACY * 2))
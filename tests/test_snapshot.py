@@ -0,0 +1,44 @@
+import datetime
+
+from columnar import ColumnarDataContainer, ColumnarStatistics
+from helpers import generate_commits, get_results, write_log
+from parser import Parser
+from snapshot import STRING_COLUMNS, StringTable, load_snapshot, save_snapshot
+
+START = datetime.datetime(2019, 3, 1)
+
+
+def round_trip(data_container, tmp_path):
+    path = str(tmp_path / 'history.snapshot')
+    save_snapshot(data_container, path)
+    return load_snapshot(path)
+
+
+def test_snapshot_statistics_match_the_container(tmp_path):
+    commits = generate_commits(300)
+    # Multi byte paths and authors, every commit without a branch decoration, so the branch column is all empty.
+    commits += [
+        ('%07x' % 900, 'jörg@exämple.日本', START, 'change', [(4, 1, 'app/über/café.py'), (2, 0, 'lib/文档/测试.py')]),
+        ('%07x' % 901, 'ünï@例え.com', START + datetime.timedelta(days=3), 'change', [(9, 3, 'app/über/café.py')]),
+        ('%07x' % 902, 'bob.ops@example.com', START + datetime.timedelta(days=40), 'change',
+         [(1, 1, 'spec/test_ñ.py')]),
+    ]
+    log_path = str(tmp_path / 'project.log')
+    write_log(log_path, commits)
+    data_container = Parser(log_path).create_data_container()
+    loaded = round_trip(data_container, tmp_path)
+
+    expected = ColumnarDataContainer.from_data_container(data_container)
+    assert not any(expected.commit_branch)
+    for name in STRING_COLUMNS:
+        assert list(getattr(loaded, name)) == list(getattr(expected, name))
+    assert 'app/über/café.py\n' in list(loaded.files)
+    assert get_results(ColumnarStatistics(loaded, 'month')) == get_results(ColumnarStatistics(data_container, 'month'))
+
+
+def test_string_table_slices_utf8_bytes():
+    strings = ['', 'a', '', 'über', '测试', '', 'x' * 70]
+    table = StringTable.from_strings(strings)
+    assert list(table) == strings
+    assert table[-4] == 'über'
+    assert list(StringTable.from_strings(['', ''])) == ['', '']
@@ -0,0 +1,201 @@
+import sys
+
+from windowing import GRANULARITIES, window_start
+
+
+def parse_rename(path):
+    """Returns (old path, new path) of a numstat rename like 'src/{old => new}/file.py', or None.
+
+    The trailing newline the parser keeps on paths is kept on both paths.
+    """
+    if ' => ' not in path:
+        return None
+    stripped = path.rstrip('\n')
+    newline = path[len(stripped):]
+    brace_start, brace_end = stripped.find('{'), stripped.find('}')
+    if brace_start != -1 and brace_start < brace_end:
+        prefix, suffix = stripped[:brace_start], stripped[brace_end + 1:]
+        old, new = stripped[brace_start + 1:brace_end].split(' => ', 1)
+        paths = [prefix + old + suffix, prefix + new + suffix]
+    else:
+        paths = stripped.split(' => ', 1)
+    return tuple(path.replace('//', '/').lstrip('/') + newline for path in paths)
+
+
+class TreeNode:
+    __slots__ = ['name', 'parent', 'children', 'additions', 'deletions', 'change_count', 'new_lines',
+                 'test_new_lines', 'authors', 'periods']
+
+    def __init__(self, name, parent=None):
+        self.name = name
+        self.parent = parent
+        self.children = {}
+        self.additions = 0
+        self.deletions = 0
+        self.change_count = 0
+        self.new_lines = 0
+        self.test_new_lines = 0
+        self.authors = set()
+        # Period start -> [additions, deletions, change count, new lines, test new lines]
+        self.periods = {}
+
+    @property
+    def path(self):
+        names = []
+        node = self
+        while node.parent is not None:
+            names.append(node.name)
+            node = node.parent
+        return '/'.join(reversed(names))
+
+    def add(self, author_email, period, additions, deletions, new_lines, test_new_lines, change_count=1):
+        self.additions += additions
+        self.deletions += deletions
+        self.change_count += change_count
+        self.new_lines += new_lines
+        self.test_new_lines += test_new_lines
+        self.authors.add(author_email)
+        counters = self.periods.get(period)
+        if counters is None:
+            counters = self.periods[period] = [0, 0, 0, 0, 0]
+        counters[0] += additions
+        counters[1] += deletions
+        counters[2] += change_count
+        counters[3] += new_lines
+        counters[4] += test_new_lines
+
+    def merge(self, other):
+        self.additions += other.additions
+        self.deletions += other.deletions
+        self.change_count += other.change_count
+        self.new_lines += other.new_lines
+        self.test_new_lines += other.test_new_lines
+        self.authors.update(other.authors)
+        for period, other_counters in other.periods.items():
+            counters = self.periods.setdefault(period, [0, 0, 0, 0, 0])
+            for index, value in enumerate(other_counters):
+                counters[index] += value
+
+    def get_dict(self, time_from=None, time_to=None):
+        if time_from is None and time_to is None:
+            additions, deletions, change_count = self.additions, self.deletions, self.change_count
+            new_lines, test_new_lines = self.new_lines, self.test_new_lines
+        else:
+            additions = deletions = change_count = new_lines = test_new_lines = 0
+            for period, counters in self.periods.items():
+                if (time_from is None or time_from <= period) and (time_to is None or period < time_to):
+                    additions += counters[0]
+                    deletions += counters[1]
+                    change_count += counters[2]
+                    new_lines += counters[3]
+                    test_new_lines += counters[4]
+        result = {
+            'path': self.path,
+            'churn': additions + deletions,
+            'additions': additions,
+            'deletions': deletions,
+            'change_count': change_count,
+            'test_line_ratio': test_new_lines / float(new_lines) if new_lines else 0,
+        }
+        if time_from is None and time_to is None:
+            result['number_of_authors'] = len(self.authors)
+        return result
+
+
+class DirectoryTree:
+    """Prefix tree over the file paths with the aggregates of its whole subtree at every node.
+
+    Every file change is added to the nodes on its path, so a directory query only walks down the path and sums
+    the periods of one node. Path components are interned, nodes of the same name share one string. Windows are
+    aligned to the granularity periods like in ChurnIndex, number_of_authors is only kept for all time.
+    """
+    def __init__(self, granularity='month'):
+        if granularity not in GRANULARITIES:
+            raise ValueError('Unknown granularity %s' % granularity)
+        self.granularity = granularity
+        self.root = TreeNode('')
+        # File path -> its node and all parent nodes up to the root.
+        self.path_nodes = {}
+        self.last_time = None
+        self.last_period = None
+
+    def get_period(self, time):
+        if time != self.last_time:
+            self.last_time = time
+            self.last_period = window_start(time, self.granularity)
+        return self.last_period
+
+    def get_node(self, path, create=False):
+        node = self.root
+        for name in path.strip().strip('/').split('/'):
+            if not name:
+                continue
+            child = node.children.get(name)
+            if child is None:
+                if not create:
+                    return None
+                child = node.children[sys.intern(name)] = TreeNode(sys.intern(name), node)
+            node = child
+        return node
+
+    def get_path_nodes(self, path):
+        nodes = self.path_nodes.get(path)
+        if nodes is None:
+            node = self.get_node(path, create=True)
+            nodes = []
+            while node is not None:
+                nodes.append(node)
+                node = node.parent
+            nodes = self.path_nodes[path] = tuple(nodes)
+        return nodes
+
+    def add(self, file_change, author, commit):
+        period = self.get_period(commit.commit_time)
+        test_new_lines = file_change.new_lines if file_change.file.is_test else 0
+        for node in self.get_path_nodes(file_change.file.path):
+            node.add(author.author_email, period, file_change.additions, file_change.deletions,
+                     file_change.new_lines, test_new_lines)
+
+    def add_commits(self, author_commits):
+        for author, commit in author_commits:
+            for file_change in commit.file_changes:
+                self.add(file_change, author, commit)
+        return self
+
+    def merge(self, other, exclude=()):
+        """Adds the files of another tree except the paths in exclude."""
+        for path, other_node in other.iter_files():
+            if path in exclude:
+                continue
+            node = self.get_node(path, create=True)
+            while node is not None:
+                node.merge(other_node)
+                node = node.parent
+
+    def iter_files(self, node=None):
+        node = node or self.root
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            if node.children:
+                stack.extend(node.children.values())
+            elif node is not self.root:
+                yield node.path, node
+
+    def query(self, path='', time_from=None, time_to=None):
+        node = self.get_node(path)
+        return node.get_dict(time_from, time_to) if node is not None else None
+
+    def rollup(self, path='', time_from=None, time_to=None):
+        """Returns the aggregates of the direct children of path, largest churn first."""
+        node = self.get_node(path)
+        if node is None:
+            return []
+        results = [child.get_dict(time_from, time_to) for child in node.children.values()]
+        return sorted(results, key=lambda result: -result['churn'])
+
+    def print_rollup(self, path='', time_from=None, time_to=None):
+        print("{:<60}{:<15}{:<15}{:<15}".format('Directory', 'churn', 'changes', 'test ratio'))
+        for result in self.rollup(path, time_from, time_to):
+            print("{:<60}{:<15}{:<15}{:<15.2f}".format(result['path'], result['churn'], result['change_count'],
+                                                       result['test_line_ratio']))
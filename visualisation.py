@@ -1,16 +1,78 @@
-import matplotlib.pyplot as plt
-import numpy
-print(numpy.__path__)
+import concurrent.futures
+import hashlib
+import json
+import os
+
 from serializer import ProjectSerializer
 
+IMAGE_FOLDER = 'images'
+HASH_FILE = 'series_hashes.json'
+
+
+def render_chart(path, times, values):
+    # Imported here so that runs without changed charts never load matplotlib.
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    plt.plot(times, values)
+    plt.tick_params(axis='both', which='major', labelsize=8)
+    plt.tick_params(axis='both', which='minor', labelsize=6)
+    plt.savefig(path)
+    plt.close()
+
+
+def get_series_hash(times, values):
+    content = json.dumps([[str(time) for time in times], values], sort_keys=True, default=str)
+    return hashlib.sha1(content.encode('utf-8')).hexdigest()
+
 
 class Visualisation:
-    def __init__(self, statistics):
-        serializer = statistics.all_time_project_stats.project_serializer
+    def __init__(self, statistics, image_folder=IMAGE_FOLDER, processes=None):
+        self.image_folder = image_folder
+        self.processes = processes
+        self.times = [st.time_from for st in statistics.quartal_project_statistics]
         quartal_serializers = [st.project_serializer for st in statistics.quartal_project_statistics]
-        for field in ProjectSerializer.fields:
-            plt.plot([st.time_from for st in statistics.quartal_project_statistics], [getattr(s, field) for s in quartal_serializers])
-            plt.tick_params(axis='both', which='major', labelsize=8)
-            plt.tick_params(axis='both', which='minor', labelsize=6)
-            plt.savefig('images/%s.png' % field)
-            plt.close()
+        self.series = [(field, [getattr(s, field) for s in quartal_serializers]) for field in ProjectSerializer.fields]
+        self.rendered = []
+        self.render()
+
+    def render(self):
+        os.makedirs(self.image_folder, exist_ok=True)
+        hashes = self.load_hashes()
+        charts = []
+        for field, values in self.series:
+            path = os.path.join(self.image_folder, '%s.png' % field)
+            series_hash = get_series_hash(self.times, values)
+            if hashes.get(field) == series_hash and os.path.exists(path):
+                continue
+            charts.append((field, path, values, series_hash))
+
+        if charts:
+            processes = min(self.processes or os.cpu_count(), len(charts))
+            if processes == 1:
+                # Rendered in this process, a pool of one worker only adds its start up.
+                for field, path, values, series_hash in charts:
+                    render_chart(path, self.times, values)
+                    hashes[field] = series_hash
+                    self.rendered.append(field)
+            else:
+                with concurrent.futures.ProcessPoolExecutor(max_workers=processes) as executor:
+                    futures = [(field, series_hash, executor.submit(render_chart, path, self.times, values))
+                               for field, path, values, series_hash in charts]
+                    for field, series_hash, future in futures:
+                        future.result()
+                        hashes[field] = series_hash
+                        self.rendered.append(field)
+        self.save_hashes(hashes)
+
+    def load_hashes(self):
+        path = os.path.join(self.image_folder, HASH_FILE)
+        if not os.path.exists(path):
+            return {}
+        with open(path, 'r') as file:
+            return json.load(file)
+
+    def save_hashes(self, hashes):
+        with open(os.path.join(self.image_folder, HASH_FILE), 'w') as file:
+            json.dump(hashes, file, indent=2, sort_keys=True)
@@ -0,0 +1,146 @@
+import bisect
+import collections
+import datetime
+
+QUARTAL = datetime.timedelta(days=90)
+GRANULARITIES = ['day', 'week', 'month', 'quarter']
+
+
+def add_months(time, months):
+    month = time.month - 1 + months
+    return time.replace(year=time.year + month // 12, month=month % 12 + 1, day=1)
+
+
+def window_start(time, granularity):
+    if isinstance(granularity, datetime.timedelta):
+        return time
+    day = datetime.datetime(time.year, time.month, time.day)
+    if granularity == 'day':
+        return day
+    if granularity == 'week':
+        return day - datetime.timedelta(days=day.weekday())
+    if granularity == 'month':
+        return day.replace(day=1)
+    if granularity == 'quarter':
+        return day.replace(month=(day.month - 1) // 3 * 3 + 1, day=1)
+    raise ValueError('Unknown granularity %s' % granularity)
+
+
+def next_window_start(time, granularity):
+    if isinstance(granularity, datetime.timedelta):
+        return time + granularity
+    if granularity == 'day':
+        return time + datetime.timedelta(days=1)
+    if granularity == 'week':
+        return time + datetime.timedelta(days=7)
+    if granularity == 'month':
+        return add_months(time, 1)
+    if granularity == 'quarter':
+        return add_months(time, 3)
+    raise ValueError('Unknown granularity %s' % granularity)
+
+
+def parse_granularity(value):
+    if value in GRANULARITIES:
+        return value
+    days = int(value)
+    if days <= 0:
+        raise ValueError('Granularity must be a positive number of days, got %s' % value)
+    return datetime.timedelta(days=days)
+
+
+def window_boundaries(time_from, time_to, granularity=QUARTAL, max_windows=None):
+    """Returns sorted window boundaries, window i is the half open interval [boundaries[i], boundaries[i + 1]).
+
+    With max_windows, intervals needing more windows raise a ValueError.
+    """
+    boundaries = [window_start(time_from, granularity)]
+    while boundaries[-1] <= time_to:
+        if max_windows is not None and len(boundaries) > max_windows:
+            raise ValueError('%s - %s needs more than %d windows' % (time_from, time_to, max_windows))
+        boundaries.append(next_window_start(boundaries[-1], granularity))
+    return boundaries
+
+
+def bucket_commits(authors, boundaries, since=None):
+    """Assigns every commit to its window in a single pass, keeping each author's commits in log order.
+
+    With since, only commits from that time on are bucketed. Author commits are in log order (newest first),
+    so each author's scan stops at the first older commit.
+    """
+    buckets = [{} for _ in range(len(boundaries) - 1)]
+    for author in authors:
+        for commit in author.commits:
+            if since is not None and commit.commit_time < since:
+                break
+            index = bisect.bisect_right(boundaries, commit.commit_time) - 1
+            if 0 <= index < len(buckets):
+                buckets[index].setdefault(author.author_email, []).append(commit)
+    return buckets
+
+
+class RollingAggregate:
+    def __init__(self):
+        self.author_commits = collections.Counter()
+        self.commit_number = 0
+        self.all_new_lines = 0
+        self.all_deleted_lines = 0
+        self.all_changed_lines = 0
+        self.test_line_number = 0
+        self.file_changes = 0
+        self.merge_commits = 0
+
+    def add(self, author, commit, sign=1):
+        self.author_commits[author] += sign
+        if not self.author_commits[author]:
+            del self.author_commits[author]
+        self.commit_number += sign
+        self.all_new_lines += sign * commit.number_of_new_lines
+        self.all_deleted_lines += sign * commit.number_of_deletions
+        self.all_changed_lines += sign * commit.number_of_changes
+        self.test_line_number += sign * commit.number_of_test_new_lines
+        self.file_changes += sign * len(commit.file_changes)
+        self.merge_commits += sign * commit.is_merge_commit
+
+    def remove(self, author, commit):
+        self.add(author, commit, sign=-1)
+
+    @property
+    def num_authors(self):
+        return len(self.author_commits)
+
+    def get_dict(self):
+        return {
+            'num_authors': self.num_authors,
+            'commit_number': self.commit_number,
+            'all_new_lines': self.all_new_lines,
+            'all_deleted_lines': self.all_deleted_lines,
+            'files_per_commit': self.file_changes / self.commit_number if self.commit_number else 0,
+            'lines_per_commit': self.all_new_lines / self.commit_number if self.commit_number else 0,
+            'test_line_ratio': self.test_line_number / self.all_new_lines if self.all_new_lines else 0,
+            'merge_commits': self.merge_commits,
+        }
+
+
+def rolling_windows(authors, width, step):
+    """Yields (time_from, time_to, RollingAggregate) for windows of the given width advancing by step.
+
+    Commits are sorted once, afterwards every commit is added and removed from the aggregate exactly once.
+    """
+    commits = sorted(((commit.commit_time, author.author_email, commit)
+                      for author in authors for commit in author.commits), key=lambda item: item[0])
+    if not commits:
+        return
+    aggregate = RollingAggregate()
+    entering = leaving = 0
+    time_from = commits[0][0]
+    while time_from <= commits[-1][0]:
+        time_to = time_from + width
+        while entering < len(commits) and commits[entering][0] < time_to:
+            aggregate.add(*commits[entering][1:])
+            entering += 1
+        while leaving < entering and commits[leaving][0] < time_from:
+            aggregate.remove(*commits[leaving][1:])
+            leaving += 1
+        yield time_from, time_to, aggregate
+        time_from += step